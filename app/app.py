@@ -26,6 +26,7 @@ class StratumApp:
         self.rendered_image_size = None
         self.polygons = None
         self.filament_shades = None
+        self._shade_lookup = (None, {})  # (filament_shades it was built from, rgb -> (shade, layer))
         self.last_input_colors = []
         self.is_multimaterial_mode = False  # Track project mode
 
@@ -123,15 +124,24 @@ class StratumApp:
             ui.notify('Generate the preview first', color='orange'); return
         r,g,b = e.args['detail']['rgb']['r'], e.args['detail']['rgb']['g'], e.args['detail']['rgb']['b']
         x,y = e.args['detail']['coords']['x'], e.args['detail']['coords']['y']
-        shade = layer = None
-        for layer_idx, shades in enumerate(self.filament_shades):
-            for shade_idx, s in enumerate(shades):
-                if s == (r,g,b):
-                    shade, layer = shade_idx, layer_idx; break
+        shade, layer = self._lookup_shade((r, g, b))
         if layer is None:
             return
         self.position_info.show((x,y), shade, layer, self.filament_shades, self.last_input_colors, int(self.controls.base_input.value))
 
+    def _lookup_shade(self, rgb):
+        """(shade index, layer index) of a rendered color, or (None, None)."""
+        shades_src, lookup = self._shade_lookup
+        if shades_src is not self.filament_shades:
+            # Rebuilt only when new shades are generated. The first matching shade of a
+            # layer wins, and a later layer wins over earlier ones.
+            lookup = {}
+            for layer_idx, shades in enumerate(self.filament_shades):
+                for shade_idx in reversed(range(len(shades))):
+                    lookup[tuple(shades[shade_idx])] = (shade_idx, layer_idx)
+            self._shade_lookup = (self.filament_shades, lookup)
+        return lookup.get(tuple(rgb), (None, None))
+
     # ---------------------- Project IO ------------------------------------
     def _gather_project_data(self) -> dict:
         project = {
@@ -22,6 +22,7 @@ from .core import (
     calculate_color_sequence_with_dithering,
     calculate_color_sequence_with_dithering_cached,
     clear_color_sequence_cache,
+    solve_unique_colors,
     
     # Layer generation
     generate_enhanced_layers,
@@ -36,8 +37,14 @@ from .utils import (
     should_use_dithering,
     find_best_dither,
     calculate_color_sequence,
+    calculate_color_sequence_image,
+    default_base_filament,
+    FilamentPalette,
+    as_filament_palette,
+    alpha_from_thickness_vec,
     composite_colors,
     color_distance,
+    color_distance_sq,
     simulate_color_blend,
     clamp01
 )
@@ -55,15 +62,22 @@ __all__ = [
     # Core functions
     "clamp01",
     "alpha_from_thickness", 
+    "alpha_from_thickness_vec",
     "composite_colors",
     "color_distance",
+    "color_distance_sq",
     "simulate_color_blend",
     
     # Color sequence calculation
     "calculate_color_sequence",
+    "calculate_color_sequence_image",
+    "default_base_filament",
+    "FilamentPalette",
+    "as_filament_palette",
     "calculate_color_sequence_with_dithering",
     "calculate_color_sequence_with_dithering_cached",
     "clear_color_sequence_cache",
+    "solve_unique_colors",
     
     # Layer generation
     "generate_sequential_layers",
@@ -8,30 +8,89 @@ Key differences:
 
 import numpy as np
 import math
+import itertools
+import multiprocessing as mp
+from collections import OrderedDict
 from typing import List, Dict, Tuple, Any
-from .utils import calculate_color_sequence_with_dithering, alpha_from_thickness
-
-_color_sequence_cache: Dict[Tuple, Dict[str, Any]] = {}
+from .utils import (calculate_color_sequence_with_dithering, calculate_color_sequence, alpha_from_thickness,
+                    default_base_filament, as_filament_palette, calculate_color_sequence_image)
 
 LAYER_HEIGHT=0.08  # Default layer height in mm for realistic blending
+PARALLEL_MIN_COLORS = 4096  # Below this many uncached colors a (spawned) process pool costs more than it saves
+COLOR_SEQUENCE_CACHE_SIZE = 1 << 16  # Cached color solutions kept before least recently used ones are evicted
+SOLVER_SETTINGS_CACHE_SIZE = 16  # Filament set / settings combinations kept; evicting one drops its solutions
+
+# LRU cache of color solutions keyed by (packed rgb, solver settings id)
+_color_sequence_cache: "OrderedDict[Tuple[int, int], Dict[str, Any]]" = OrderedDict()
+# LRU map of filament set + solver settings -> small integer id used in cache keys.
+# Ids are never reused, so solutions of an evicted id can not be mistaken for new ones
+_solver_settings_ids: "OrderedDict[Tuple, int]" = OrderedDict()
+_next_settings_id = itertools.count()
+
+
+def _solver_settings_id(available_filaments: Dict[str, Dict[str, Any]],
+                        base_filament: str,
+                        layer_height: float,
+                        max_layers: int) -> int:
+    """Map a filament set and solver settings to a small integer for compact cache keys."""
+    filament_key = tuple(sorted((name, tuple(data['color']), data['td'])
+                               for name, data in available_filaments.items()))
+    settings = (filament_key, base_filament, layer_height, max_layers)
+    settings_id = _solver_settings_ids.get(settings)
+    if settings_id is not None:
+        _solver_settings_ids.move_to_end(settings)
+        return settings_id
+
+    settings_id = _solver_settings_ids[settings] = next(_next_settings_id)
+    if len(_solver_settings_ids) > SOLVER_SETTINGS_CACHE_SIZE:
+        _, evicted_id = _solver_settings_ids.popitem(last=False)
+        for cache_key in [key for key in _color_sequence_cache if key[1] == evicted_id]:
+            del _color_sequence_cache[cache_key]
+    return settings_id
+
+
+def _pack_rgb(rgb: Tuple[int, int, int]) -> int:
+    """Pack an RGB triple into a single 24-bit integer."""
+    return (int(rgb[0]) << 16) | (int(rgb[1]) << 8) | int(rgb[2])
+
+
+def _cache_get(cache_key: Tuple[int, int]) -> Dict[str, Any]:
+    """Look up a cached color solution and mark it as recently used."""
+    result = _color_sequence_cache.get(cache_key)
+    if result is not None:
+        _color_sequence_cache.move_to_end(cache_key)
+    return result
+
+
+def _cache_put(cache_key: Tuple[int, int], result: Dict[str, Any]):
+    """Store a color solution, evicting the least recently used one when full."""
+    _color_sequence_cache[cache_key] = result
+    _color_sequence_cache.move_to_end(cache_key)
+    if len(_color_sequence_cache) > COLOR_SEQUENCE_CACHE_SIZE:
+        _color_sequence_cache.popitem(last=False)
+
 
 def calculate_color_sequence_with_dithering_cached(target_rgb: Tuple[int, int, int],
                                                  available_filaments: Dict[str, Dict[str, Any]],
                                                  base_filament: str = None,
                                                  layer_height: float = LAYER_HEIGHT,
-                                                 max_layers: int = 5) -> Dict[str, Any]:
+                                                 max_layers: int = 5,
+                                                 settings_id: int = None) -> Dict[str, Any]:
     """
     Cached version of calculate_color_sequence_with_dithering for better performance.
-    Uses a global cache to avoid recalculating identical target colors.
+    Uses a bounded global LRU cache to avoid recalculating identical target colors.
+    Callers looking up many colors should compute settings_id once with
+    _solver_settings_id and pass it in.
     """
     # Create cache key from parameters
-    filament_key = tuple(sorted((name, tuple(data['color']), data['td'])
-                               for name, data in available_filaments.items()))
-    cache_key = (target_rgb, filament_key, base_filament, layer_height, max_layers)
+    if settings_id is None:
+        settings_id = _solver_settings_id(available_filaments, base_filament, layer_height, max_layers)
+    cache_key = (_pack_rgb(target_rgb), settings_id)
 
     # Check cache first
-    if cache_key in _color_sequence_cache:
-        return _color_sequence_cache[cache_key]
+    result = _cache_get(cache_key)
+    if result is not None:
+        return result
 
     # Calculate if not in cache
     result = calculate_color_sequence_with_dithering(
@@ -39,16 +98,115 @@ def calculate_color_sequence_with_dithering_cached(target_rgb: Tuple[int, int, i
     )
 
     # Store in cache
-    _color_sequence_cache[cache_key] = result
+    _cache_put(cache_key, result)
     return result
 
 
 def clear_color_sequence_cache():
     """Clear the color sequence cache. Call this when switching filament sets."""
-    global _color_sequence_cache
     _color_sequence_cache.clear()
+    _solver_settings_ids.clear()
     print(f"Color sequence cache cleared")
 
+
+def _solve_color(target_rgb: Tuple[int, int, int],
+                 available_filaments: Dict[str, Dict[str, Any]],
+                 base_filament: str,
+                 layer_height: float,
+                 max_layers: int,
+                 dithering: bool) -> Dict[str, Any]:
+    """Compute the (uncached) layer solution for a single target color."""
+    if dithering:
+        return calculate_color_sequence_with_dithering(
+            target_rgb, available_filaments, base_filament, layer_height, max_layers
+        )
+    # Force sequential-only approach when dithering is disabled
+    color_sequence, _ = calculate_color_sequence(
+        target_rgb, available_filaments, base_filament, layer_height, max_layers
+    )
+    return {'type': 'sequential', 'sequence': color_sequence}
+
+
+# Solver settings of the current pool worker, set once by _init_color_solution_worker
+_worker_solver_settings = None
+
+
+def _init_color_solution_worker(available_filaments, base_filament, layer_height, max_layers, dithering):
+    """Pool initializer: keep one copy of the solver settings per worker process."""
+    global _worker_solver_settings
+    _worker_solver_settings = (available_filaments, base_filament, layer_height, max_layers, dithering)
+
+
+def process_color_solution(target_rgb):
+    """Worker function for parallel color solution search."""
+    return _solve_color(target_rgb, *_worker_solver_settings)
+
+
+def solve_unique_colors(unique_colors: List[Tuple[int, int, int]],
+                        available_filaments: Dict[str, Dict[str, Any]],
+                        base_filament: str,
+                        layer_height: float,
+                        max_layers: int,
+                        dithering: bool = True,
+                        progress_cb: callable = None,
+                        settings_id: int = None) -> List[Dict[str, Any]]:
+    """
+    Compute the layer solution for every distinct color of an image.
+
+    Colors already in the color sequence cache are reused; the remaining ones are
+    solved in a process pool when there are enough of them to amortize the start-up.
+    settings_id is the cache key part from _solver_settings_id, computed here if omitted.
+
+    Returns:
+        List of solutions aligned with unique_colors
+    """
+    solutions = [None] * len(unique_colors)
+    if settings_id is None:
+        settings_id = _solver_settings_id(available_filaments, base_filament, layer_height, max_layers)
+    pending = []
+    for i, color in enumerate(unique_colors):
+        if dithering:
+            cached = _cache_get((_pack_rgb(color), settings_id))
+            if cached is not None:
+                solutions[i] = cached
+                continue
+        pending.append(i)
+
+    # Only the colors travel to the workers; the filaments are converted to array form
+    # once here and sent once per process
+    tasks = [unique_colors[i] for i in pending]
+    settings = (as_filament_palette(available_filaments), base_filament, layer_height, max_layers, dithering)
+    total = len(tasks)
+    progress_step = max(1, total // 100)
+
+    def collect(results):
+        for n, (i, solution) in enumerate(zip(pending, results), start=1):
+            solutions[i] = solution
+            if dithering:
+                _cache_put((_pack_rgb(unique_colors[i]), settings_id), solution)
+            if progress_cb and n % progress_step == 0:
+                progress_cb(n / total)
+
+    if not dithering and total:
+        # Sequential-only solutions come from one batched search over all colors
+        palette = settings[0]
+        layer_indices, _ = calculate_color_sequence_image(
+            np.array(tasks, dtype=np.int64), palette, base_filament, layer_height, max_layers
+        )
+        collect({'type': 'sequential', 'sequence': [palette.names[j] for j in row if j >= 0]}
+                for row in layer_indices.tolist())
+    elif total >= PARALLEL_MIN_COLORS and mp.cpu_count() > 1:
+        chunksize = max(1, total // (mp.cpu_count() * 8))
+        with mp.Pool(processes=mp.cpu_count(), initializer=_init_color_solution_worker,
+                     initargs=settings) as pool:
+            collect(pool.imap(process_color_solution, tasks, chunksize=chunksize))
+    else:
+        collect(_solve_color(color, *settings) for color in tasks)
+
+    if progress_cb:
+        progress_cb(1.0)
+    return solutions
+
 def generate_enhanced_layers(image_array: np.ndarray,
                            available_filaments: Dict[str, Dict[str, Any]],
                            base_filament: str = None,
@@ -84,7 +242,6 @@ def generate_enhanced_layers(image_array: np.ndarray,
         Tuple of (layers, dither_info) where dither_info contains dithering patterns
     """
     height, width = image_array.shape[:2]
-    total_pixels = height * width
 
     # Adjust max_layers for face down mode to account for base layers
     if face_down and base_layers > 0:
@@ -101,8 +258,7 @@ def generate_enhanced_layers(image_array: np.ndarray,
 
     # Ensure base_filament is valid and in available_filaments
     if base_filament is None or base_filament not in available_filaments:
-        base_filament = max(available_filaments.keys(),
-                          key=lambda name: sum(available_filaments[name]['color']))
+        base_filament = default_base_filament(available_filaments)
         print(f"Using '{base_filament}' as base filament (automatically selected)")
 
     # Calculate appropriate dither pattern size based on physical constraints
@@ -121,10 +277,6 @@ def generate_enhanced_layers(image_array: np.ndarray,
         # Default pattern size when no physical constraints provided
         pattern_size = 8
 
-    # Track which layers have dithering for each pixel position
-    pixel_dithered_layers = {}  # (x,y) -> set of layer indices with dithering
-    pixel_top_layers = {}       # (x,y) -> highest layer index used for this pixel
-
     # Initialize layer dictionaries
     for i in range(effective_max_layers):
         layers[i] = {}
@@ -133,156 +285,144 @@ def generate_enhanced_layers(image_array: np.ndarray,
     if progress_cb:
         progress_cb(0.0)
 
-    # Process each pixel with progress reporting
-    pixels_processed = 0
-    for y in range(height):
-        for x in range(width):
-            target_color = tuple(image_array[y, x])
-            pixel_pos = (x, y)
+    # Solve each distinct color once (sequential or dithered); pixels sharing a
+    # color share its solution. Solving takes the first half of the progress range.
+    flat_colors = image_array[..., :3].reshape(-1, 3)
+    unique_array, color_index = np.unique(flat_colors, axis=0, return_inverse=True)
+    color_index = color_index.reshape(height, width)
+    unique_colors = [tuple(int(c) for c in color) for color in unique_array]
+    # The filament set is hashed into a cache key once for the whole image
+    settings_id = _solver_settings_id(available_filaments, base_filament, layer_height, color_max_layers)
+    solutions = solve_unique_colors(
+        unique_colors,
+        available_filaments,
+        base_filament,
+        layer_height,
+        color_max_layers,  # Use reduced max_layers for color calculation
+        dithering,
+        progress_cb=(lambda v: progress_cb(0.5 * v)) if progress_cb else None,
+        settings_id=settings_id
+    )
 
-            # Get enhanced color solution (sequential or dithered) - using cached version
-            if dithering:
-                solution = calculate_color_sequence_with_dithering_cached(
-                    target_color,
-                    available_filaments,
-                    base_filament,
-                    layer_height,
-                    color_max_layers  # Use reduced max_layers for color calculation
-                )
-            else:
-                # Force sequential-only approach when dithering is disabled
-                from .utils import calculate_color_sequence
-                color_sequence = calculate_color_sequence(
-                    target_color,
-                    available_filaments,
-                    base_filament,
-                    layer_height,
-                    color_max_layers
-                )
-                solution = {'type': 'sequential', 'sequence': color_sequence}
-
-            if solution['type'] == 'sequential':
-                # Standard sequential approach
-                color_sequence = solution['sequence']
-
-                # Add base layers for face down mode
-                if face_down and base_layers > 0:
-                    # Add base layers at the end of the sequence for face down
-                    color_sequence = color_sequence + [base_filament] * base_layers
-
-                for layer_idx, filament_name in enumerate(color_sequence):
-                    if layer_idx < effective_max_layers:
-                        if filament_name not in layers[layer_idx]:
-                            layers[layer_idx][filament_name] = []
-                        layers[layer_idx][filament_name].append((x, y))
-
-                        # Track the highest layer for this pixel
-                        pixel_top_layers[pixel_pos] = layer_idx
-
-            elif solution['type'] == 'dithered' and dithering:
-                # Only process dithered solutions if dithering is enabled
-                # First apply base sequence
-                base_sequence = solution['base_sequence']
-
-                # Add base layers for face down mode
-                if face_down and base_layers > 0:
-                    # Add base layers at the end of the sequence for face down
-                    base_sequence = base_sequence + [base_filament] * base_layers
-
-                for layer_idx, filament_name in enumerate(base_sequence):
-                    if layer_idx < effective_max_layers:
-                        if filament_name not in layers[layer_idx]:
-                            layers[layer_idx][filament_name] = []
-                        layers[layer_idx][filament_name].append((x, y))
-
-                        # Track the highest layer for this pixel
-                        pixel_top_layers[pixel_pos] = layer_idx
-
-                # Then apply dithering - place it in a separate intermediate layer ABOVE the base sequence
-                dither_filament = solution['dither_filament']
-                dither_ratio = solution['dither_ratio']
-                dither_pattern = solution['dither_pattern']
-
-                # Calculate the base layer where the sequence ends for this pixel
-                base_end_layer = len(base_sequence) - 1
-                current_pixel_top = pixel_top_layers.get(pixel_pos, -1)
-
-                # Find an intermediate layer for dithering (between base sequence and top)
-                best_dither_layer = None
-
-                # Strategy: Place dithering in the next available layer AFTER the base sequence
-                # but ensure it's not the topmost layer if constraint is enabled
-                candidate_layer = base_end_layer + 1
-
-                if candidate_layer < effective_max_layers:
-                    can_place_here = True
-
-                    # Top layer constraint: prevent dithering if it would be the topmost layer FOR THIS PIXEL
-                    if not allow_top_layer_dithering:
-                        # We need to ensure there's room for at least one more layer on top
-                        if candidate_layer + 1 >= effective_max_layers:
-                            can_place_here = False
-
-                    # Spacing constraint: check for consecutive dithering AT THIS PIXEL POSITION
-                    if can_place_here and min_layers_between_dithering > 0:
-                        pixel_dithered = pixel_dithered_layers.get(pixel_pos, set())
-                        for existing_dither_layer in pixel_dithered:
-                            if abs(candidate_layer - existing_dither_layer) <= min_layers_between_dithering:
-                                can_place_here = False
-                                break
-
-                    if can_place_here:
-                        best_dither_layer = candidate_layer
-
-                        # If we're not allowing top layer dithering, add a protective layer on top
-                        if not allow_top_layer_dithering and len(base_sequence) > 0:
-                            protective_layer = candidate_layer + 1
-                            if protective_layer < effective_max_layers:
-                                # Use the last filament from base sequence as protective layer
-                                protective_filament = base_sequence[-1]
-                                if protective_filament not in layers[protective_layer]:
-                                    layers[protective_layer][protective_filament] = []
-                                layers[protective_layer][protective_filament].append((x, y))
-
-                                # Update the pixel's top layer
-                                pixel_top_layers[pixel_pos] = protective_layer
-
-                # Apply dithering if we found a valid layer
-                if best_dither_layer is not None:
-                    # Track dithering for this pixel position
-                    if pixel_pos not in pixel_dithered_layers:
-                        pixel_dithered_layers[pixel_pos] = set()
-                    pixel_dithered_layers[pixel_pos].add(best_dither_layer)
-
-                    # Generate dither pattern for this specific region
+    # Group pixel coordinates by color so each solution is applied to all of its
+    # pixels at once
+    pixel_order = np.argsort(color_index, axis=None, kind='stable')
+    color_counts = np.bincount(color_index.ravel(), minlength=len(unique_colors))
+    color_bounds = np.concatenate(([0], np.cumsum(color_counts)))
+    all_ys, all_xs = np.divmod(pixel_order, width)
+
+    # Dither patterns tiled over the whole image, keyed by (ratio, pattern type)
+    full_patterns = {}
+    pattern_reps = (-(-height // pattern_size), -(-width // pattern_size))
+
+    def add_pixels(layer_idx, filament_name, xs, ys):
+        if len(xs) == 0:
+            return
+        if filament_name not in layers[layer_idx]:
+            layers[layer_idx][filament_name] = []
+        layers[layer_idx][filament_name].extend(zip(xs.tolist(), ys.tolist()))
+
+    # Place each color's solution with progress reporting
+    progress_step = max(1, len(solutions) // 100)
+    for color_idx, solution in enumerate(solutions):
+        start, end = color_bounds[color_idx], color_bounds[color_idx + 1]
+        ys, xs = all_ys[start:end], all_xs[start:end]
+        target_color = unique_colors[color_idx]
+
+        if solution['type'] == 'sequential':
+            # Standard sequential approach
+            color_sequence = solution['sequence']
+
+            # Add base layers for face down mode
+            if face_down and base_layers > 0:
+                # Add base layers at the end of the sequence for face down
+                color_sequence = color_sequence + [base_filament] * base_layers
+
+            for layer_idx, filament_name in enumerate(color_sequence):
+                if layer_idx < effective_max_layers:
+                    add_pixels(layer_idx, filament_name, xs, ys)
+
+        elif solution['type'] == 'dithered' and dithering:
+            # Only process dithered solutions if dithering is enabled
+            # First apply base sequence
+            base_sequence = solution['base_sequence']
+
+            # Add base layers for face down mode
+            if face_down and base_layers > 0:
+                # Add base layers at the end of the sequence for face down
+                base_sequence = base_sequence + [base_filament] * base_layers
+
+            for layer_idx, filament_name in enumerate(base_sequence):
+                if layer_idx < effective_max_layers:
+                    add_pixels(layer_idx, filament_name, xs, ys)
+
+            # Then apply dithering - place it in a separate intermediate layer ABOVE the base sequence
+            dither_filament = solution['dither_filament']
+            dither_ratio = solution['dither_ratio']
+            dither_pattern = solution['dither_pattern']
+
+            # Calculate the base layer where the sequence ends for these pixels
+            base_end_layer = len(base_sequence) - 1
+
+            # Find an intermediate layer for dithering (between base sequence and top)
+            best_dither_layer = None
+
+            # Strategy: Place dithering in the next available layer AFTER the base sequence
+            # but ensure it's not the topmost layer if constraint is enabled
+            candidate_layer = base_end_layer + 1
+
+            if candidate_layer < effective_max_layers:
+                can_place_here = True
+
+                # Top layer constraint: prevent dithering if it would be the topmost layer FOR THESE PIXELS
+                if not allow_top_layer_dithering:
+                    # We need to ensure there's room for at least one more layer on top
+                    if candidate_layer + 1 >= effective_max_layers:
+                        can_place_here = False
+
+                # Spacing constraint (min_layers_between_dithering): every pixel gets exactly
+                # one solution and so at most one dithered layer, which always satisfies it
+
+                if can_place_here:
+                    best_dither_layer = candidate_layer
+
+                    # If we're not allowing top layer dithering, add a protective layer on top
+                    if not allow_top_layer_dithering and len(base_sequence) > 0:
+                        protective_layer = candidate_layer + 1
+                        if protective_layer < effective_max_layers:
+                            # Use the last filament from base sequence as protective layer
+                            add_pixels(protective_layer, base_sequence[-1], xs, ys)
+
+            # Apply dithering if we found a valid layer
+            if best_dither_layer is not None:
+                # Look up the image-wide dither pattern for this ratio and type
+                pattern_key = (dither_ratio, dither_pattern)
+                full_pattern = full_patterns.get(pattern_key)
+                if full_pattern is None:
                     local_pattern = generate_dither_pattern(
                         pattern_size, pattern_size, dither_ratio, dither_pattern
                     )
-
-                    # Check if this pixel should get the dither filament
-                    pattern_x = x % pattern_size
-                    pattern_y = y % pattern_size
-
-                    if local_pattern[pattern_y, pattern_x]:
-                        if dither_filament not in layers[best_dither_layer]:
-                            layers[best_dither_layer][dither_filament] = []
-                        layers[best_dither_layer][dither_filament].append((x, y))
-
-                        # Store dither info for visualization
-                        pixel_key = f"{x},{y}"
-                        dither_info[pixel_key] = {
-                            'layer': best_dither_layer,
-                            'filament': dither_filament,
-                            'ratio': dither_ratio,
-                            'pattern': dither_pattern,
-                            'target_color': target_color
-                        }
-
-            # Update progress every 100 pixels to avoid too frequent callbacks
-            pixels_processed += 1
-            if progress_cb and pixels_processed % 100 == 0:
-                progress = pixels_processed / total_pixels
-                progress_cb(progress)
+                    full_pattern = np.tile(local_pattern, pattern_reps)[:height, :width]
+                    full_patterns[pattern_key] = full_pattern
+
+                # Keep only the pixels the pattern assigns to the dither filament
+                hit = full_pattern[ys, xs]
+                dither_ys, dither_xs = ys[hit], xs[hit]
+                add_pixels(best_dither_layer, dither_filament, dither_xs, dither_ys)
+
+                # Store dither info for visualization
+                for x, y in zip(dither_xs.tolist(), dither_ys.tolist()):
+                    dither_info[f"{x},{y}"] = {
+                        'layer': best_dither_layer,
+                        'filament': dither_filament,
+                        'ratio': dither_ratio,
+                        'pattern': dither_pattern,
+                        'target_color': target_color
+                    }
+
+        # Update progress about 100 times over all colors
+        if progress_cb and (color_idx + 1) % progress_step == 0:
+            progress_cb(0.5 + 0.5 * (color_idx + 1) / len(solutions))
 
     # Report completion of pixel processing
     if progress_cb:
@@ -290,13 +430,17 @@ def generate_enhanced_layers(image_array: np.ndarray,
 
     # Apply face down mode if requested
     if face_down:
-        # Reverse the layer order
-        layers = layers[::-1]
+        # Reverse the layer order in place (no copy of the layer list)
+        layers.reverse()
 
         # Update dither_info layer indices to match reversed order
-        for pixel_key, dither_data in dither_info.items():
-            old_layer = dither_data['layer']
-            dither_data['layer'] = effective_max_layers - 1 - old_layer
+        if dither_info:
+            dither_entries = list(dither_info.values())
+            old_layers = np.fromiter((d['layer'] for d in dither_entries), dtype=np.int64,
+                                     count=len(dither_entries))
+            new_layers = effective_max_layers - 1 - old_layers
+            for dither_data, new_layer in zip(dither_entries, new_layers.tolist()):
+                dither_data['layer'] = new_layer
 
     return layers, dither_info
 
@@ -354,19 +498,23 @@ def render_result_image(layers: List[Dict[str, List[Tuple[int, int]]]],
     """
     height, width = image_shape[:2]
 
-    # Pre-calculate alpha values
-    filament_alphas = {
-        name: alpha_from_thickness(layer_height, filament['td'])
-        for name, filament in available_filaments.items()
-    }
+    # Pre-calculate per-filament blend terms: the 1/256-quantized weight kept on
+    # the layer below (1 - alpha) and the filament's premultiplied Q8.8 color
+    # (plus the rounding offset), so the per-layer blend is one multiply-add
+    filament_blend_terms = {}
+    for name, filament in available_filaments.items():
+        alpha_q = int(round(alpha_from_thickness(layer_height, filament['td']) * 256))
+        premultiplied = (np.array(filament['color'], dtype=np.uint32) << 8) * alpha_q + 128
+        filament_blend_terms[name] = (256 - alpha_q, premultiplied)
 
     # Determine base color
     if base_filament is None or base_filament not in available_filaments:
-        base_filament = max(available_filaments.keys(),
-                          key=lambda name: sum(available_filaments[name]['color']))
+        base_filament = default_base_filament(available_filaments)
 
-    base_color = np.array(available_filaments[base_filament]['color'], dtype=np.float32)
-    current_result = np.full((height, width, 3), base_color, dtype=np.float32)
+    # The running result is kept in Q8.8 fixed point (color * 256) in uint16 and
+    # alphas are quantized to 1/256 steps, so the whole blend is integer-only.
+    base_color = np.array(available_filaments[base_filament]['color'], dtype=np.uint16) << 8
+    current_result = np.full((height, width, 3), base_color, dtype=np.uint16)
 
     # Determine layer order based on face_down mode
     if face_down:
@@ -381,37 +529,27 @@ def render_result_image(layers: List[Dict[str, List[Tuple[int, int]]]],
         if not layer_assignment:  # Skip empty layers
             continue
 
-        # Create layer mask for all filaments at once
-        layer_mask = np.zeros((height, width), dtype=bool)
-        layer_colors = np.zeros((height, width, 3), dtype=np.float32)
-        layer_alphas = np.zeros((height, width), dtype=np.float32)
-
-        # Process all filaments in this layer
+        # Blend each filament directly on its own pixels. A pixel holds at most
+        # one filament per layer, so no full-frame mask/color/alpha scratch
+        # buffers are needed.
         for filament_name, positions in layer_assignment.items():
             if not positions or filament_name not in available_filaments:
                 continue
 
-            filament_color = np.array(available_filaments[filament_name]['color'], dtype=np.float32)
-            alpha = filament_alphas[filament_name]
+            one_minus_alpha_q, premultiplied = filament_blend_terms[filament_name]
 
             # Convert positions to arrays
-            if positions:
-                pos_array = np.array(positions)
-                xs, ys = pos_array[:, 0], pos_array[:, 1]
-
-                # Set mask and colors for these positions
-                layer_mask[ys, xs] = True
-                layer_colors[ys, xs] = filament_color
-                layer_alphas[ys, xs] = alpha
-
-        # Apply blending only where there are pixels to blend
-        if np.any(layer_mask):
-            # Vectorized blending for all affected pixels at once
-            affected_pixels = current_result[layer_mask]
-            filament_pixels = layer_colors[layer_mask]
-            alphas = layer_alphas[layer_mask, np.newaxis]  # Broadcast for RGB
-
-            blended = affected_pixels * (1.0 - alphas) + filament_pixels * alphas
-            current_result[layer_mask] = blended
-
-    return np.round(current_result).astype(np.uint8)
+            pos_array = np.array(positions)
+            xs, ys = pos_array[:, 0], pos_array[:, 1]
+
+            # Products of a Q8.8 value and a 0..256 weight need 32 bits before shifting back
+            blended = current_result[ys, xs].astype(np.uint32)
+            blended *= one_minus_alpha_q
+            blended += premultiplied
+            blended >>= 8
+            current_result[ys, xs] = blended
+
+    # Round Q8.8 back to 8-bit color in place; the uint8 result is the only new allocation
+    current_result += 128
+    current_result >>= 8
+    return current_result.astype(np.uint8)
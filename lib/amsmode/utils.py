@@ -1,14 +1,19 @@
 import numpy as np
 import math
-from typing import List, Dict, Tuple, Any
+from functools import lru_cache
+from typing import List, Dict, Tuple, Any, Union
 
 def clamp01(x: float) -> float:
     """Clamp value to [0, 1] range."""
     return 0.0 if x < 0.0 else (1.0 if x > 1.0 else x)
 
 
+@lru_cache(maxsize=512)
 def alpha_from_thickness(h: float, td_eff: float) -> float:
-    """Map layer thickness to opacity using fitted curve from original implementation."""
+    """
+    Map layer thickness to opacity using fitted curve from original implementation.
+    Memoized, since it is called with the same few (layer height, TD) pairs throughout.
+    """
     if td_eff <= 0:
         return 1.0
 
@@ -23,14 +28,30 @@ def alpha_from_thickness(h: float, td_eff: float) -> float:
     return clamp01(alpha)
 
 
+def alpha_from_thickness_vec(h, td_eff) -> np.ndarray:
+    """
+    Vectorized alpha_from_thickness over arrays of layer heights and/or TDs.
+
+    Only a handful of distinct (height, TD) pairs ever occur, so the curve is evaluated
+    once per distinct pair and looked up from there, matching the scalar version exactly.
+    """
+    h_arr, td_arr = np.broadcast_arrays(np.asarray(h, dtype=np.float64),
+                                        np.asarray(td_eff, dtype=np.float64))
+    pairs = np.stack([h_arr.ravel(), td_arr.ravel()], axis=1)
+    unique_pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    lut = np.array([alpha_from_thickness(float(pair_h), float(pair_td)) for pair_h, pair_td in unique_pairs],
+                   dtype=np.float64)
+    return lut[inverse.reshape(-1)].reshape(h_arr.shape)
+
+
 def composite_colors(base_rgb: Tuple[int, int, int],
                     top_rgb: Tuple[int, int, int],
                     alpha: float) -> Tuple[int, int, int]:
     """Composite top color over base with given alpha using proper blending."""
-    return tuple(
-        int(round(base_rgb[i] * (1.0 - alpha) + top_rgb[i] * alpha))
-        for i in range(3)
-    )
+    one_minus_alpha = 1.0 - alpha
+    return (int(round(base_rgb[0] * one_minus_alpha + top_rgb[0] * alpha)),
+            int(round(base_rgb[1] * one_minus_alpha + top_rgb[1] * alpha)),
+            int(round(base_rgb[2] * one_minus_alpha + top_rgb[2] * alpha)))
 
 
 def color_distance(color1: Tuple[int, int, int], color2: Tuple[int, int, int]) -> float:
@@ -38,6 +59,14 @@ def color_distance(color1: Tuple[int, int, int], color2: Tuple[int, int, int]) -
     return math.sqrt(sum((float(a) - float(b)) ** 2 for a, b in zip(color1, color2)))
 
 
+def color_distance_sq(color1: Tuple[int, int, int], color2: Tuple[int, int, int]) -> int:
+    """Squared Euclidean distance between two RGB colors, for comparisons that only need ordering."""
+    dr = int(color1[0]) - int(color2[0])
+    dg = int(color1[1]) - int(color2[1])
+    db = int(color1[2]) - int(color2[2])
+    return dr * dr + dg * dg + db * db
+
+
 def simulate_color_blend(base_color: Tuple[int, int, int],
                         filament_color: Tuple[int, int, int],
                         filament_alpha: float) -> Tuple[int, int, int]:
@@ -45,91 +74,264 @@ def simulate_color_blend(base_color: Tuple[int, int, int],
     return composite_colors(base_color, filament_color, filament_alpha)
 
 
+def default_base_filament(available_filaments: Dict[str, Dict[str, Any]]) -> str:
+    """Name of the brightest filament (largest r+g+b), the default base; first one wins ties."""
+    best_name, best_sum = None, -1
+    for name, filament in available_filaments.items():
+        color = filament['color']
+        color_sum = color[0] + color[1] + color[2]
+        if color_sum > best_sum:
+            best_sum, best_name = color_sum, name
+    return best_name
+
+
+class FilamentPalette:
+    """
+    Structure-of-arrays view of an available_filaments dict.
+
+    Names, colors (N, 3) and TDs (N,) are kept in matching order so the color search
+    can score all filaments in one broadcast; per-layer-height alphas are computed on
+    first use and cached. Arrays are read-only.
+    """
+
+    def __init__(self, names: List[str], colors: List[Tuple[int, int, int]], tds: List[float]):
+        self.names = list(names)
+        self._color_tuples = [tuple(color) for color in colors]
+        self.colors = np.array(self._color_tuples, dtype=np.float64).reshape(-1, 3)
+        self.tds = np.array(tds, dtype=np.float64)
+        self.colors.flags.writeable = False
+        self.tds.flags.writeable = False
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self._alpha_cache = {}
+
+    @classmethod
+    def from_dict(cls, available_filaments: Dict[str, Dict[str, Any]]) -> 'FilamentPalette':
+        """Build a palette from a dict of filament_name -> {'color': (r,g,b), 'td': float}."""
+        names = list(available_filaments)
+        return cls(names,
+                   [available_filaments[name]['color'] for name in names],
+                   [available_filaments[name]['td'] for name in names])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def color(self, name: str) -> Tuple[int, int, int]:
+        """Color of the named filament."""
+        return self._color_tuples[self.index[name]]
+
+    def brightest(self) -> str:
+        """Name of the brightest filament (largest r+g+b); first one wins ties."""
+        return self.names[int(self.colors.sum(axis=1).argmax())]
+
+    def alphas(self, layer_height: float) -> np.ndarray:
+        """Per-filament alphas (N,) for one layer of layer_height."""
+        alphas = self._alpha_cache.get(layer_height)
+        if alphas is None:
+            alphas = alpha_from_thickness_vec(layer_height, self.tds)
+            alphas.flags.writeable = False
+            self._alpha_cache[layer_height] = alphas
+        return alphas
+
+
+# Palettes converted from filament dicts, reused across the many per-color calls
+_PALETTE_CACHE_SIZE = 8
+_palette_cache = {}
+
+
+def as_filament_palette(available_filaments: Union[Dict[str, Dict[str, Any]], FilamentPalette]) -> FilamentPalette:
+    """
+    Return available_filaments as a FilamentPalette, converting a dict only once.
+
+    Converted palettes are keyed by the filaments' contents (names, colors and TDs),
+    so a dict edited in place gets a fresh palette.
+    """
+    if isinstance(available_filaments, FilamentPalette):
+        return available_filaments
+
+    key = tuple((name, tuple(data['color']), data['td']) for name, data in available_filaments.items())
+    palette = _palette_cache.get(key)
+    if palette is not None:
+        return palette
+
+    palette = FilamentPalette.from_dict(available_filaments)
+    if len(_palette_cache) >= _PALETTE_CACHE_SIZE:
+        _palette_cache.pop(next(iter(_palette_cache)))
+    _palette_cache[key] = palette
+    return palette
+
+
+def _min_improvement(alphas: np.ndarray) -> float:
+    """Stopping threshold of the layer search, adapted to the average filament transparency."""
+    avg_alpha = float(alphas.mean())
+    # More transparent filaments (higher TD, lower alpha) need more lenient stopping
+    return 0.5 if avg_alpha < 0.6 else (0.8 if avg_alpha < 0.8 else 1.0)
+
+
 def calculate_color_sequence(target_rgb: Tuple[int, int, int],
-                           available_filaments: Dict[str, Dict[str, Any]],
+                           available_filaments: Union[Dict[str, Dict[str, Any]], FilamentPalette],
                            base_filament: str = None,
                            layer_height: float = 0.1,
-                           max_layers: int = 5) -> List[str]:
+                           max_layers: int = 5) -> Tuple[List[str], Tuple[int, int, int]]:
     """
     Determine the sequence of filament colors to build up the target color.
     Uses dynamic color matching based on available filaments.
 
     Args:
         target_rgb: Target color to achieve
-        available_filaments: Dict of filament_name -> {'color': (r,g,b), 'td': float}
+        available_filaments: Dict of filament_name -> {'color': (r,g,b), 'td': float},
+            or a FilamentPalette
         base_filament: Name of base filament (substrate), must be in available_filaments
         layer_height: Height of each layer for alpha calculation
         max_layers: Maximum number of layers to use
 
     Returns:
-        List of filament names in the order they should be applied
+        Tuple of (filament names in the order they should be applied,
+        color reached after applying them)
     """
-    if not available_filaments:
-        return []
+    palette = as_filament_palette(available_filaments)
+    if not len(palette):
+        return [], None
 
-    # Calculate alpha values for each filament
-    filament_alphas = {
-        name: alpha_from_thickness(layer_height, filament['td'])
-        for name, filament in available_filaments.items()
-    }
+    # Filament colors and alphas as arrays so each layer tries all filaments in one broadcast
+    filament_names, filament_colors = palette.names, palette.colors
+    alphas = palette.alphas(layer_height)
 
     # Ensure base filament is valid and in available_filaments
-    if base_filament is None or base_filament not in available_filaments:
-        base_filament = max(available_filaments.keys(),
-                          key=lambda name: sum(available_filaments[name]['color']))
+    if base_filament is None or base_filament not in palette:
+        base_filament = palette.brightest()
 
     # Start with base color (substrate)
-    current_color = available_filaments[base_filament]['color']
-    sequence = []
+    current_color = palette.color(base_filament)
+    # Fixed-size buffer filled up to layer_count; room for the white start even when max_layers is 0
+    sequence = [None] * max(max_layers, 1)
+    layer_count = 0
 
     # For very bright colors, check if starting with white gives better results
-    # but only if white is different from the base filament
-    target_brightness = int(target_rgb[0]) + int(target_rgb[1]) + int(target_rgb[2])
-    if (target_brightness > 600 and 'white' in available_filaments and
-        base_filament != 'white'):
-        white_start_distance = color_distance(target_rgb, available_filaments['white']['color'])
-        base_start_distance = color_distance(target_rgb, current_color)
-        if white_start_distance < base_start_distance:
-            current_color = available_filaments['white']['color']
-            sequence.append('white')  # Add white as first layer over base
-
-    # Calculate average transparency to adapt stopping criteria
-    avg_alpha = sum(filament_alphas.values()) / len(filament_alphas)
-    # More transparent filaments (higher TD, lower alpha) need more lenient stopping
-    min_improvement = 0.5 if avg_alpha < 0.6 else (0.8 if avg_alpha < 0.8 else 1.0)
+    # but only if white is different from the base filament. Target components are
+    # plain ints (see generate_enhanced_layers), so no coercion is needed; the cheap
+    # palette checks go first so the sum is skipped without a white filament.
+    if ('white' in palette and base_filament != 'white' and
+        target_rgb[0] + target_rgb[1] + target_rgb[2] > 600):
+        white_start_distance_sq = color_distance_sq(target_rgb, palette.color('white'))
+        base_start_distance_sq = color_distance_sq(target_rgb, current_color)
+        if white_start_distance_sq < base_start_distance_sq:
+            current_color = palette.color('white')
+            sequence[0] = 'white'  # Add white as first layer over base
+            layer_count = 1
+
+    min_improvement = _min_improvement(alphas)
+
+    alphas = alphas[:, np.newaxis]
+    target = np.array(target_rgb, dtype=np.float64)
+    current = np.array(current_color, dtype=np.float64)
 
     # Iteratively find best filament to get closer to target
-    for layer in range(max_layers - len(sequence)):  # Account for any layers already added
-        best_filament = None
-        best_distance = float('inf')
-        best_result_color = current_color
-
-        # Try each available filament (including the base filament again)
-        for filament_name, filament_data in available_filaments.items():
-            filament_color = filament_data['color']
-            alpha = filament_alphas[filament_name]
-
-            # Simulate blending this filament over current color
-            result_color = simulate_color_blend(current_color, filament_color, alpha)
-            distance = color_distance(target_rgb, result_color)
-
-            # Check if this gets us closer to target
-            if distance < best_distance:
-                best_distance = distance
-                best_filament = filament_name
-                best_result_color = result_color
+    for layer in range(layer_count, max_layers):  # Account for any layers already added
+        # Simulate blending every filament (including the base filament again) over
+        # the current color, rounded like composite_colors
+        blended = np.rint(current * (1.0 - alphas) + filament_colors * alphas)
+        distances_sq = np.square(blended - target).sum(axis=1)
+        best_idx = int(distances_sq.argmin())
+        best_distance = math.sqrt(distances_sq[best_idx])
 
         # Stop if we're already very close or not making progress
-        current_distance = color_distance(target_rgb, current_color)
+        current_distance = math.sqrt(np.square(current - target).sum())
         improvement = current_distance - best_distance
         if current_distance < 2 or improvement < min_improvement:
             break
 
         # Add best filament to sequence and update current color
-        sequence.append(best_filament)
-        current_color = best_result_color
+        sequence[layer_count] = filament_names[best_idx]
+        layer_count += 1
+        current = blended[best_idx]
+
+    return sequence[:layer_count], tuple(int(c) for c in current)
+
+
+def calculate_color_sequence_image(image: np.ndarray,
+                                   available_filaments: Union[Dict[str, Dict[str, Any]], FilamentPalette],
+                                   base_filament: str = None,
+                                   layer_height: float = 0.1,
+                                   max_layers: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batched calculate_color_sequence over every pixel of an image.
 
-    return sequence
+    Each distinct color is solved once, and the greedy layer search runs for all of
+    them simultaneously; colors drop out of the active set as soon as they stop
+    improving. Results match calculate_color_sequence color by color.
+
+    Args:
+        image: Target colors, shape (..., 3), e.g. an (H, W, 3) uint8 image
+        available_filaments: Dict of filament_name -> {'color': (r,g,b), 'td': float},
+            or a FilamentPalette
+        base_filament: Name of base filament (substrate)
+        layer_height: Height of each layer for alpha calculation
+        max_layers: Maximum number of layers to use
+
+    Returns:
+        Tuple of (filament indices into the palette names, shape (..., max_layers), in
+        the smallest signed integer type that fits the palette, padded with -1; color reached after applying them, shape (..., 3) uint8)
+    """
+    palette = as_filament_palette(available_filaments)
+    image = np.asarray(image)
+    out_shape = image.shape[:-1]
+    width = max(max_layers, 1)
+    # Smallest signed type holding both -1 and the largest palette index
+    index_dtype = np.min_scalar_type(-max(len(palette), 1))
+    if not len(palette):
+        return (np.full(out_shape + (width,), -1, dtype=index_dtype),
+                np.zeros(out_shape + (3,), dtype=np.uint8))
+
+    filament_colors = palette.colors
+    alphas = palette.alphas(layer_height)
+    if base_filament is None or base_filament not in palette:
+        base_filament = palette.brightest()
+    min_improvement = _min_improvement(alphas)
+    alphas = alphas[:, np.newaxis]
+
+    unique_targets, inverse = np.unique(image.reshape(-1, 3), axis=0, return_inverse=True)
+    targets = unique_targets.astype(np.float64)
+    count = len(targets)
+
+    current = np.broadcast_to(filament_colors[palette.index[base_filament]], (count, 3)).copy()
+    chosen = np.full((count, width), -1, dtype=index_dtype)
+    layers_used = np.zeros(count, dtype=np.intp)
+
+    # White start for very bright targets, as in calculate_color_sequence
+    if 'white' in palette and base_filament != 'white':
+        white_idx = palette.index['white']
+        white_start = ((targets.sum(axis=1) > 600)
+                       & (np.square(targets - filament_colors[white_idx]).sum(axis=1)
+                          < np.square(targets - current).sum(axis=1)))
+        current[white_start] = filament_colors[white_idx]
+        chosen[white_start, 0] = white_idx
+        layers_used[white_start] = 1
+
+    active = np.flatnonzero(layers_used < max_layers)
+    while len(active):
+        cur = current[active]
+        tgt = targets[active]
+        # Every filament blended over every active color, (A, N, 3)
+        blended = np.rint(cur[:, np.newaxis, :] * (1.0 - alphas) + filament_colors * alphas)
+        distances_sq = np.square(blended - tgt[:, np.newaxis, :]).sum(axis=2)
+        best_idx = distances_sq.argmin(axis=1)
+        best_distance = np.sqrt(distances_sq[np.arange(len(active)), best_idx])
+        current_distance = np.sqrt(np.square(cur - tgt).sum(axis=1))
+
+        # Colors that are close enough or stopped improving leave the active set
+        keep = (current_distance >= 2) & (current_distance - best_distance >= min_improvement)
+        active, best_idx = active[keep], best_idx[keep]
+        chosen[active, layers_used[active]] = best_idx
+        current[active] = blended[keep, best_idx]
+        layers_used[active] += 1
+        active = active[layers_used[active] < max_layers]
+
+    inverse = inverse.reshape(-1)
+    return (chosen[inverse].reshape(out_shape + (width,)),
+            current.astype(np.uint8)[inverse].reshape(out_shape + (3,)))
 
 def calculate_dither_blend(base_color: Tuple[int, int, int],
                           dither_color: Tuple[int, int, int],
@@ -157,17 +359,66 @@ def calculate_dither_blend(base_color: Tuple[int, int, int],
     dithered_color = composite_colors(base_color, dither_color, dither_alpha)
 
     # Average between base and dithered areas
-    effective_color = tuple(
-        int(round(base_color[i] * (1.0 - dither_ratio) + dithered_color[i] * dither_ratio))
-        for i in range(3)
-    )
+    base_weight = 1.0 - dither_ratio
+    effective_color = (int(round(base_color[0] * base_weight + dithered_color[0] * dither_ratio)),
+                       int(round(base_color[1] * base_weight + dithered_color[1] * dither_ratio)),
+                       int(round(base_color[2] * base_weight + dithered_color[2] * dither_ratio)))
 
     return effective_color
 
 
+# Dither ratios are whole eighths, so the area-weighted average can be done in integers
+DITHER_RATIO_EIGHTHS = np.array([1, 2, 3, 4, 5, 6, 7])
+DITHER_RATIOS = DITHER_RATIO_EIGHTHS / 8.0
+DITHER_PATTERNS = ('horizontal', 'vertical')
+# Coarser ratios (0.25, 0.5, 0.75) used by should_use_dithering to decide whether dithering is worth it
+DITHER_CHECK_RATIO_EIGHTHS = np.array([2, 4, 6])
+
+
+def _dither_errors_sq(filament_colors: np.ndarray,
+                      alphas: np.ndarray,
+                      current_base: Tuple[int, int, int],
+                      target_color: Tuple[int, int, int],
+                      ratio_eighths: np.ndarray) -> np.ndarray:
+    """
+    Squared error of every (filament, ratio) dither candidate at once, shape (N, R).
+
+    Blends are rounded like calculate_dither_blend: first the filament composited over
+    the base, then its area-weighted average with the base. The average is computed in
+    integers as (base*(8-n) + dithered*n) / 8, rounding halves to even like round().
+    """
+    base = np.array(current_base, dtype=np.int64)
+    target = np.array(target_color, dtype=np.int64)
+    alphas = alphas[:, np.newaxis]
+    eighths = ratio_eighths[:, np.newaxis]
+
+    dithered_colors = np.rint(base * (1.0 - alphas) + filament_colors * alphas).astype(np.int64)  # (N, 3)
+    weighted = base * (8 - eighths) + dithered_colors[:, np.newaxis, :] * eighths  # (N, R, 3)
+    dithered_results = (weighted + 4) >> 3
+    dithered_results -= ((weighted & 7) == 4) & (dithered_results & 1).astype(bool)
+    return np.square(dithered_results - target).sum(axis=2)
+
+
+def _best_dither_candidate(filament_colors: np.ndarray,
+                           alphas: np.ndarray,
+                           current_base: Tuple[int, int, int],
+                           target_color: Tuple[int, int, int]) -> Tuple[int, int]:
+    """
+    Numeric kernel of find_best_dither: score every (filament, ratio) candidate at once.
+
+    Returns:
+        Tuple of (filament index, ratio index) of the first candidate with minimal error
+    """
+    errors_sq = _dither_errors_sq(filament_colors, alphas, current_base, target_color, DITHER_RATIO_EIGHTHS)
+
+    # argmin picks the first minimum in (filament, ratio) order, like a nested loop would
+    best_idx, best_ratio_idx = np.unravel_index(int(errors_sq.argmin()), errors_sq.shape)
+    return int(best_idx), int(best_ratio_idx)
+
+
 def should_use_dithering(target_color: Tuple[int, int, int],
                         best_sequential_color: Tuple[int, int, int],
-                        available_filaments: Dict[str, Dict[str, Any]],
+                        available_filaments: Union[Dict[str, Dict[str, Any]], FilamentPalette],
                         current_base: Tuple[int, int, int],
                         layer_height: float = 0.1,
                         dither_threshold: float = 5.0) -> bool:
@@ -186,28 +437,25 @@ def should_use_dithering(target_color: Tuple[int, int, int],
     Returns:
         True if dithering should be used
     """
-    sequential_error = color_distance(target_color, best_sequential_color)
-
-    # Try dithering with each available filament
-    best_dither_error = sequential_error
-
-    for filament_name, filament_data in available_filaments.items():
-        filament_color = filament_data['color']
-        alpha = alpha_from_thickness(layer_height, filament_data['td'])
-
-        # Try different dither ratios
-        for ratio in [0.25, 0.5, 0.75]:
-            dithered_result = calculate_dither_blend(current_base, filament_color, alpha, ratio)
-            dither_error = color_distance(target_color, dithered_result)
-            best_dither_error = min(best_dither_error, dither_error)
-
-    # Use dithering if it provides significant improvement
-    improvement = sequential_error - best_dither_error
+    sequential_error_sq = color_distance_sq(target_color, best_sequential_color)
+
+    # Score every filament at every check ratio in one broadcast; dithering can only
+    # help if some candidate beats the sequential result
+    best_dither_error_sq = sequential_error_sq
+    palette = as_filament_palette(available_filaments)
+    if len(palette):
+        candidate_error_sq = int(_dither_errors_sq(palette.colors, palette.alphas(layer_height), current_base,
+                                                   target_color, DITHER_CHECK_RATIO_EIGHTHS).min())
+        best_dither_error_sq = min(best_dither_error_sq, candidate_error_sq)
+
+    # Use dithering if it provides significant improvement; only the two
+    # winning errors need a square root
+    improvement = math.sqrt(sequential_error_sq) - math.sqrt(best_dither_error_sq)
     return improvement > dither_threshold
 
 
 def find_best_dither(target_color: Tuple[int, int, int],
-                    available_filaments: Dict[str, Dict[str, Any]],
+                    available_filaments: Union[Dict[str, Dict[str, Any]], FilamentPalette],
                     current_base: Tuple[int, int, int],
                     layer_height: float = 0.1) -> Tuple[str, float, str]:
     """
@@ -222,31 +470,21 @@ def find_best_dither(target_color: Tuple[int, int, int],
     Returns:
         Tuple of (best_filament_name, best_ratio, best_pattern_type)
     """
-    best_error = float('inf')
-    best_filament = None
-    best_ratio = 0.0
-    best_pattern = 'horizontal'
-
-    for filament_name, filament_data in available_filaments.items():
-        filament_color = filament_data['color']
-        alpha = alpha_from_thickness(layer_height, filament_data['td'])
-
-        # Try different ratios and patterns
-        for ratio in [0.125, 0.25, 0.375, 0.5, 0.625, 0.75, 0.875]:
-            for pattern in ['horizontal', 'vertical']:
-                dithered_result = calculate_dither_blend(current_base, filament_color, alpha, ratio)
-                error = color_distance(target_color, dithered_result)
-
-                if error < best_error:
-                    best_error = error
-                    best_filament = filament_name
-                    best_ratio = ratio
-                    best_pattern = pattern
+    palette = as_filament_palette(available_filaments)
+    if not len(palette):
+        return None, 0.0, DITHER_PATTERNS[0]
+
+    best_idx, best_ratio_idx = _best_dither_candidate(palette.colors, palette.alphas(layer_height),
+                                                      current_base, target_color)
+    best_filament = palette.names[best_idx]
+    best_ratio = float(DITHER_RATIOS[best_ratio_idx])
+    # The pattern does not change the blended color, so the first pattern always wins ties
+    best_pattern = DITHER_PATTERNS[0]
 
     return best_filament, best_ratio, best_pattern
 
 def calculate_color_sequence_with_dithering(target_rgb: Tuple[int, int, int],
-                                           available_filaments: Dict[str, Dict[str, Any]],
+                                           available_filaments: Union[Dict[str, Dict[str, Any]], FilamentPalette],
                                            base_filament: str = None,
                                            layer_height: float = 0.1,
                                            max_layers: int = 5) -> Dict[str, Any]:
@@ -257,43 +495,25 @@ def calculate_color_sequence_with_dithering(target_rgb: Tuple[int, int, int],
     Returns:
         Dict with 'type': 'sequential' or 'dithered', and relevant parameters
     """
+    # Convert once; the steps below all work on the same palette
+    palette = as_filament_palette(available_filaments)
+
     # Ensure base_filament is valid and in available_filaments
-    if base_filament is None or base_filament not in available_filaments:
-        base_filament = max(available_filaments.keys(),
-                          key=lambda name: sum(available_filaments[name]['color']))
+    if base_filament is None or base_filament not in palette:
+        base_filament = palette.brightest()
 
-    # First, try sequential approach
-    sequential_sequence = calculate_color_sequence(
-        target_rgb, available_filaments, base_filament, layer_height, max_layers
+    # First, try sequential approach; it also reports the color it achieves
+    # (starting from base, or from white for very bright targets)
+    sequential_sequence, current_color = calculate_color_sequence(
+        target_rgb, palette, base_filament, layer_height, max_layers
     )
-
-    # Calculate what color sequential approach achieves (starting from base)
-    current_color = available_filaments[base_filament]['color']
-
-    # For very bright colors, check if starting with white gives better results
-    # but only if white is different from the base filament
-    target_brightness = int(target_rgb[0]) + int(target_rgb[1]) + int(target_rgb[2])
-    if (target_brightness > 600 and 'white' in available_filaments and
-        base_filament != 'white'):
-        white_start_distance = color_distance(target_rgb, available_filaments['white']['color'])
-        base_start_distance = color_distance(target_rgb, current_color)
-        if white_start_distance < base_start_distance:
-            current_color = available_filaments['white']['color']
-
-    # Simulate sequential result
-    for filament_name in sequential_sequence:
-        if filament_name in available_filaments:
-            filament_color = available_filaments[filament_name]['color']
-            alpha = alpha_from_thickness(layer_height, available_filaments[filament_name]['td'])
-            current_color = composite_colors(current_color, filament_color, alpha)
-
     sequential_result_color = current_color
 
     # Check if dithering could improve things significantly
-    if should_use_dithering(target_rgb, sequential_result_color, available_filaments, current_color):
+    if should_use_dithering(target_rgb, sequential_result_color, palette, current_color):
         # Find best dithering solution
         best_filament, best_ratio, best_pattern = find_best_dither(
-            target_rgb, available_filaments, current_color, layer_height
+            target_rgb, palette, current_color, layer_height
         )
 
         return {
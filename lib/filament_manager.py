@@ -1,6 +1,20 @@
 from nicegui import app, ui
+import asyncio
 import json
 import uuid
+import weakref
+
+# Managers (one per page load) with changes not yet written to storage
+_unsaved_managers = weakref.WeakSet()
+
+
+def _flush_unsaved_filaments():
+    """Write the pending changes of every manager; registered once for app shutdown"""
+    for manager in list(_unsaved_managers):
+        manager.flush_filaments()
+
+
+app.on_shutdown(_flush_unsaved_filaments)
 
 
 class FilamentManager:
@@ -21,17 +35,96 @@ class FilamentManager:
         self.editing_filament_id = None
         self.on_add_callback = None
         self.tab_panels = None
+        # Drawn rows of the "All" (False) and favorites (True) lists, by filament id
+        self._list_state = {}
+        # Filaments sorted for display, rebuilt lazily after a mutation
+        self._sorted_cache = None
+        # Set when a favorite toggle left the "All" list out of sort order
+        self._all_list_unsorted = False
+        # Pending storage write, coalesced over bursts of edits
+        self._dirty = False
+        self._save_timer = None
+        # Pending list redraw, coalesced over rapid edits; the favorites list is always
+        # redrawn, the "All" list only when _refresh_all is set
+        self._refresh_timer = None
+        self._refresh_all = False
 
         # Load saved filaments from storage
         self.load_filaments()
+        # Tied to this page's client (not the app), so the handler goes away with the page
+        ui.context.client.on_disconnect(self._cancel_refresh)
 
     def load_filaments(self):
         self.saved_filaments = app.storage.general.get('saved_filaments', [])
+        self._reindex()
+
+    def _reindex(self):
+        """Rebuild the filament id -> list index lookup"""
+        self._id_index = {f['id']: i for i, f in enumerate(self.saved_filaments)}
+        self._sorted_cache = None
+
+    def _get_sorted(self):
+        """Saved filaments sorted favorites first, then by name (cached until the next change)"""
+        if self._sorted_cache is None:
+            self._sorted_cache = sorted(self.saved_filaments,
+                                        key=lambda f: (not f['favorite'], f['name'].lower()))
+        return self._sorted_cache
 
     def save_filaments(self):
-        """Save filaments to NiceGUI storage"""
+        """Mark filaments as changed; they are written to storage once edits settle"""
+        self._dirty = True
+        _unsaved_managers.add(self)
+        self._schedule_save()
+
+    def _schedule_save(self, delay=0.5):
+        """(Re)start the one-shot timer that writes pending changes"""
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. called outside the UI): write right away
+            self.flush_filaments()
+            return
+        self._save_timer = loop.call_later(delay, self.flush_filaments)
+
+    def flush_filaments(self):
+        """Write filaments to NiceGUI storage if there are unsaved changes"""
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        _unsaved_managers.discard(self)
         app.storage.general['saved_filaments'] = self.saved_filaments
 
+    def _schedule_refresh(self, favorites_only=False, delay=0.1):
+        """Redraw the filament lists once after a short delay, merging repeated requests"""
+        self._refresh_all = self._refresh_all or not favorites_only
+        if self._refresh_timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._do_refresh()
+            return
+        self._refresh_timer = loop.call_later(delay, self._do_refresh)
+
+    def _do_refresh(self):
+        """Redraw the lists requested since the last refresh"""
+        self._refresh_timer = None
+        if self._refresh_all:
+            self._refresh_all = False
+            self.update_filament_list(container=self.filament_list_container)
+        self.update_filament_list(container=self.filament_list_container_favs, favorites_only=True)
+
+    def _cancel_refresh(self):
+        """Drop a pending redraw"""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+
     def add_filament(self):
         """Add a new filament to the saved list"""
         filament = {
@@ -42,10 +135,11 @@ class FilamentManager:
             'favorite': self.favorite_checkbox.value
         }
 
+        self._id_index[filament['id']] = len(self.saved_filaments)
         self.saved_filaments.append(filament)
+        self._sorted_cache = None
         self.save_filaments()
-        self.update_filament_list(container=self.filament_list_container)
-        self.update_filament_list(container=self.filament_list_container_favs, favorites_only=True)
+        self._schedule_refresh()
 
         if self.favorite_checkbox.value:
             self.tab_panels.value = 'Favorites'
@@ -62,19 +156,19 @@ class FilamentManager:
 
     def find_filament_by_id(self, filament_id):
         """Find filament by ID and return both filament and index"""
-        for idx, filament in enumerate(self.saved_filaments):
-            if filament['id'] == filament_id:
-                return filament, idx
-        return None, -1
+        idx = self._id_index.get(filament_id, -1)
+        if idx < 0:
+            return None, -1
+        return self.saved_filaments[idx], idx
 
     def remove_filament(self, filament_id):
         """Remove a filament from the saved list"""
         filament, idx = self.find_filament_by_id(filament_id)
         if idx >= 0:
             self.saved_filaments.pop(idx)
+            self._reindex()
             self.save_filaments()
-            self.update_filament_list(container=self.filament_list_container)
-            self.update_filament_list(container=self.filament_list_container_favs, favorites_only=True)
+            self._schedule_refresh()
             ui.notify('Filament removed', color='info')
 
     def toggle_favorite(self, filament_id):
@@ -82,9 +176,30 @@ class FilamentManager:
         filament, idx = self.find_filament_by_id(filament_id)
         if idx >= 0:
             self.saved_filaments[idx]['favorite'] = not self.saved_filaments[idx]['favorite']
+            self._sorted_cache = None
             self.save_filaments()
+            # Only the card itself changes in the "All" list; it is re-sorted on the next rebuild
+            self.refresh_favorite(filament_id)
+            self._all_list_unsorted = True
+            self._schedule_refresh(favorites_only=True)
+
+    def refresh_favorite(self, filament_id):
+        """Update the favorite icon and name of a card in the "All" list in place"""
+        state = self._list_state.get(False)
+        entry = state['rows'].get(filament_id) if state else None
+        filament, _ = self.find_filament_by_id(filament_id)
+        if entry is None or filament is None:
             self.update_filament_list(container=self.filament_list_container)
-            self.update_filament_list(container=self.filament_list_container_favs, favorites_only=True)
+            return
+
+        self._patch_filament_row(entry, filament)
+
+    @staticmethod
+    def _display_name(filament):
+        """Card title: the filament name, starred for favorites"""
+        if filament['favorite']:
+            return f"⭐ {filament['name']}"
+        return filament['name']
 
     def add_to_project(self, filament_id):
         """Add a filament to the project filament list"""
@@ -103,65 +218,127 @@ class FilamentManager:
                 self.on_add_callback(project_filament)
 
     def update_filament_list(self, container=None, favorites_only=False):
-        """Update the filament list display"""
+        """Update the filament list display, patching rows in place by filament id"""
         if not container:
             return
 
-        container.clear()
+        state = self._list_state.get(favorites_only)
+        if state is None or state['container'] is not container:
+            # First draw into this container
+            container.clear()
+            state = {'container': container, 'rows': {}, 'placeholder': None}
+            self._list_state[favorites_only] = state
+        rows = state['rows']
+        if not favorites_only:
+            self._all_list_unsorted = False
 
         # Sort filaments: favorites first, then by name
-        sorted_filaments = sorted(self.saved_filaments,
-                                  key=lambda f: (not f['favorite'], f['name'].lower()))
-
-        with container:
-            if not sorted_filaments:
-                ui.markdown('**No filaments saved**').classes('text-gray-500 p-4')
-                return
-
-            for filament in sorted_filaments:
-                if favorites_only and not filament['favorite']:
-                    continue
-
-                with ui.row().classes('items-center justify-between w-full'):
-                    with ui.row().classes('items-center gap-3'):
-                        # Color indicator
-                        ui.html(
-                            f"<div style=\"width: 30px; height: 30px; border-radius: 50%; border: 2px solid #ccc; background-color: {filament['color']};\"></div>")
-
-                        # Filament info
-                        with ui.column().classes('gap-0'):
-                            name_text = filament['name']
-                            if filament['favorite']:
-                                name_text = f"⭐ {name_text}"
-                            ui.label(name_text).classes('font-semibold')
-                            ui.label(f"TD: {filament['td_value']}").classes(
-                                'text-sm text-gray-500')
-
-                    # Action buttons
-                    with ui.row().classes('gap-1'):
-                        ui.button(
-                            icon='add',
-                            on_click=lambda _, fid=filament['id']: self.add_to_project(fid)
-                        ).props('flat round size=sm color=primary').tooltip('Add to Project')
-
-                        ui.button(
-                            icon='favorite' if filament['favorite'] else 'favorite_border',
-                            on_click=lambda _, fid=filament['id']: self.toggle_favorite(fid)
-                        ).props('flat round size=sm color=orange').tooltip('Toggle Favorite')
-
-                        ui.button(
-                            icon='delete',
-                            on_click=lambda _, fid=filament['id']: self.remove_filament(fid)
-                        ).props('flat round size=sm color=red').tooltip('Delete')
-
-                        ui.button(
-                            icon='edit',
-                            on_click=lambda _, fid=filament['id']: self.open_edit_dialog(fid)
-                        ).props('flat round size=sm color=blue').tooltip('Edit')
+        sorted_filaments = self._get_sorted()
+        if favorites_only:
+            # Favorites sort first, so the favorites list is a prefix of the sorted list
+            favorite_count = sum(1 for f in self.saved_filaments if f['favorite'])
+            listed_filaments = sorted_filaments[:favorite_count]
+        else:
+            listed_filaments = sorted_filaments
+
+        # Drop rows of filaments that are no longer listed
+        listed_ids = {f['id'] for f in listed_filaments}
+        for filament_id in [fid for fid in rows if fid not in listed_ids]:
+            rows.pop(filament_id)['row'].delete()
+
+        if not sorted_filaments:
+            if state['placeholder'] is None:
+                with container:
+                    state['placeholder'] = ui.markdown('**No filaments saved**').classes('text-gray-500 p-4')
+            return
+        if state['placeholder'] is not None:
+            state['placeholder'].delete()
+            state['placeholder'] = None
+
+        children = container.default_slot.children
+        for position, filament in enumerate(listed_filaments):
+            entry = rows.get(filament['id'])
+            if entry is None:
+                with container:
+                    entry = self._build_filament_row(filament)
+                rows[filament['id']] = entry
+            else:
+                self._patch_filament_row(entry, filament)
+            # Rows before this position are already in order, so a row sitting at its
+            # index stays put; moving it would still queue a container update
+            if position >= len(children) or children[position] is not entry['row']:
+                entry['row'].move(target_index=position)
+
+    def _build_filament_row(self, filament):
+        """Create the row for one filament and return references to its changing parts"""
+        with ui.row().classes('items-center justify-between w-full') as row:
+            with ui.row().classes('items-center gap-3'):
+                # Color indicator
+                color_dot = ui.html(self._color_dot_html(filament['color']))
+
+                # Filament info
+                with ui.column().classes('gap-0'):
+                    name_label = ui.label(self._display_name(filament)).classes('font-semibold')
+                    td_label = ui.label(f"TD: {filament['td_value']}").classes(
+                        'text-sm text-gray-500')
+
+            # Action buttons; they share one handler per action and carry the filament id
+            with ui.row().classes('gap-1'):
+                add_btn = ui.button(
+                    icon='add',
+                    on_click=self._on_add_click
+                ).props('flat round size=sm color=primary').tooltip('Add to Project')
+
+                icon_btn = ui.button(
+                    icon='favorite' if filament['favorite'] else 'favorite_border',
+                    on_click=self._on_favorite_click
+                ).props('flat round size=sm color=orange').tooltip('Toggle Favorite')
+
+                delete_btn = ui.button(
+                    icon='delete',
+                    on_click=self._on_delete_click
+                ).props('flat round size=sm color=red').tooltip('Delete')
+
+                edit_btn = ui.button(
+                    icon='edit',
+                    on_click=self._on_edit_click
+                ).props('flat round size=sm color=blue').tooltip('Edit')
+
+                for button in (add_btn, icon_btn, delete_btn, edit_btn):
+                    button._fid = filament['id']
+
+        return {'row': row, 'color_dot': color_dot, 'name_label': name_label,
+                'td_label': td_label, 'icon_btn': icon_btn}
+
+    def _on_add_click(self, e):
+        self.add_to_project(e.sender._fid)
+
+    def _on_favorite_click(self, e):
+        self.toggle_favorite(e.sender._fid)
+
+    def _on_delete_click(self, e):
+        self.remove_filament(e.sender._fid)
+
+    def _on_edit_click(self, e):
+        self.open_edit_dialog(e.sender._fid)
+
+    def _patch_filament_row(self, entry, filament):
+        """Bring an existing row up to date with the filament's current values"""
+        entry['color_dot'].set_content(self._color_dot_html(filament['color']))
+        entry['name_label'].set_text(self._display_name(filament))
+        entry['td_label'].set_text(f"TD: {filament['td_value']}")
+        entry['icon_btn'].props(f"icon={'favorite' if filament['favorite'] else 'favorite_border'}")
+
+    @staticmethod
+    def _color_dot_html(color):
+        """Round color swatch shown at the start of a row"""
+        return f"<div style=\"width: 30px; height: 30px; border-radius: 50%; border: 2px solid #ccc; background-color: {color};\"></div>"
 
     def open_dialog(self):
         """Open the filament management dialog"""
         if self.filament_dialog:
+            if self._all_list_unsorted:
+                self.update_filament_list(container=self.filament_list_container)
             self.filament_dialog.open()
 
     def open_edit_dialog(self, filament_id):
@@ -277,10 +454,10 @@ class FilamentManager:
             filament['color'] = self.edit_color_input.value
             filament['td_value'] = float(self.edit_td_value_input.value)
             filament['favorite'] = self.edit_favorite_checkbox.value
+            self._sorted_cache = None
 
             self.save_filaments()
-            self.update_filament_list(container=self.filament_list_container)
-            self.update_filament_list(container=self.filament_list_container_favs, favorites_only=True)
+            self._schedule_refresh()
 
             ui.notify('Filament updated successfully', color='green')
             self.edit_dialog.close()
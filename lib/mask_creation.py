@@ -1,52 +1,181 @@
+import hashlib
 import math
+from functools import lru_cache
 
 from PIL import Image
 import numpy as np
-from skimage.color import rgb2lab
+from scipy.spatial import cKDTree
 
 from lib.utils import timed
 
 TRANSMISSION_TO_BLEND_FACTOR = 0.1
+# Pixels per block of the nearest-shade search, so each (block, N) distance array stays in cache
+SEGMENT_TILE_PIXELS = 65536
+# From this many shades on, a KD-tree query beats the brute-force distance product
+SEGMENT_KDTREE_MIN_SHADES = 192
 
-@timed
-def segment_to_shades(source_image: Image, filament_shades):
-    # Convert to RGBA to handle transparency
-    rgba = np.asarray(source_image.convert('RGBA'), dtype=float)
-    rgb = rgba[..., :3] / 255.0  # RGB channels normalized to [0,1]
-    alpha = rgba[..., 3]  # Alpha channel (0-255)
+# sRGB (linear) -> XYZ matrix and D65 reference white, as used by skimage's rgb2lab
+_XYZ_FROM_RGB = np.array([[0.412453, 0.357580, 0.180423],
+                          [0.212671, 0.715160, 0.072169],
+                          [0.019334, 0.119193, 0.950227]])
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
 
-    # Create transparency mask (alpha = 0 means fully transparent)
-    transparent_mask = alpha == 0
 
-    lab = rgb2lab(rgb)  # (H, W, 3)
+def _rgb_to_lab_small(rgb01: np.ndarray) -> np.ndarray:
+    """
+    Direct sRGB -> LAB for a small (N, 3) array of colors in [0, 1].
+    Same formulas as skimage's rgb2lab, without its per-call overhead.
+    """
+    rgb01 = np.asarray(rgb01, dtype=np.float64)
+    linear = np.where(rgb01 > 0.04045, ((rgb01 + 0.055) / 1.055) ** 2.4, rgb01 / 12.92)
+    xyz = (linear @ _XYZ_FROM_RGB.T) / _D65_WHITE
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16.0 / 116.0)
+    fx, fy, fz = f[:, 0], f[:, 1], f[:, 2]
+    return np.stack([116.0 * fy - 16.0, 500.0 * (fx - fy), 200.0 * (fy - fz)], axis=1)
 
-    h, w, _ = lab.shape
-    lab_flat = lab.reshape(-1, 3)  # (H*W, 3)
-    transparent_flat = transparent_mask.reshape(-1)  # (H*W,)
 
-    flat_shades = [shade for shade_list in filament_shades for shade in shade_list]
-    print(f"Total shades: {len(flat_shades)}")
-    shade_rgb = np.array(flat_shades, dtype=float)  # (N, 3), still 0–255
+# sRGB -> linear for every 8-bit value, and the XYZ matrix with the reference white folded in
+_SRGB_TO_LINEAR_U8 = np.where(np.arange(256) / 255.0 > 0.04045,
+                              ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4,
+                              np.arange(256) / 255.0 / 12.92).astype(np.float32)
+_XYZ_NORM_FROM_RGB_T = (_XYZ_FROM_RGB.T / _D65_WHITE).astype(np.float32)
+
 
-    shade_rgb_norm = shade_rgb / 255.0
-    shade_lab = rgb2lab(shade_rgb_norm.reshape(1, -1, 3)).reshape(-1, 3)  # (N, 3)
+def _rgb_to_lab_u8(rgb_u8: np.ndarray) -> np.ndarray:
+    """
+    sRGB -> LAB for an (M, 3) uint8 array, in float32 with few full-size temporaries.
+    Gamma is a table lookup; otherwise the same formulas as skimage's rgb2lab.
+    """
+    xyz = _SRGB_TO_LINEAR_U8[rgb_u8] @ _XYZ_NORM_FROM_RGB_T  # (M, 3), relative to white
+    f = np.cbrt(xyz)
+    linear_part = xyz <= 0.008856
+    f[linear_part] = xyz[linear_part] * np.float32(7.787) + np.float32(16.0 / 116.0)
 
-    dists = np.linalg.norm(lab_flat[:, None, :] - shade_lab[None, :, :], axis=2)
+    lab = np.empty_like(f)
+    np.multiply(f[:, 1], 116.0, out=lab[:, 0])
+    lab[:, 0] -= 16.0
+    np.subtract(f[:, 0], f[:, 1], out=lab[:, 1])
+    lab[:, 1] *= 500.0
+    np.subtract(f[:, 1], f[:, 2], out=lab[:, 2])
+    lab[:, 2] *= 200.0
+    return lab
 
-    nearest = np.argmin(dists, axis=1)  # (H*W,)
 
-    seg_flat_rgb = shade_rgb[nearest].astype(np.uint8)  # (H*W, 3)
-    seg_rgb = seg_flat_rgb.reshape(h, w, 3)
+# LAB values of recently used shade sets, keyed by their RGB bytes (oldest evicted first)
+SHADE_LAB_CACHE_SIZE = 8
+_shade_lab_cache = {}
 
-    # Create alpha channel for output
-    seg_alpha = np.where(transparent_mask, 0, 255).astype(np.uint8)
 
-    # Combine RGB and Alpha channels
-    seg_rgba = np.dstack([seg_rgb, seg_alpha])
+def _shades_to_lab(shade_rgb: np.ndarray):
+    """
+    LAB of an (N, 3) array of 0-255 shade colors, memoized per shade set.
+
+    Returns:
+        Tuple of (LAB channel-major (3, N) float32, contiguous so pixel blocks can be
+        multiplied against it without a transpose; squared LAB norms (N,))
+    """
+    key = shade_rgb.astype(np.uint8).tobytes()
+    entry = _shade_lab_cache.get(key)
+    if entry is None:
+        shade_lab = _rgb_to_lab_small(shade_rgb / 255.0).astype(np.float32)
+        entry = (np.ascontiguousarray(shade_lab.T), np.einsum('ij,ij->i', shade_lab, shade_lab))
+        if len(_shade_lab_cache) >= SHADE_LAB_CACHE_SIZE:
+            _shade_lab_cache.pop(next(iter(_shade_lab_cache)))
+        _shade_lab_cache[key] = entry
+    return entry
+
+# Recent segmentation results, keyed by image and shade set (oldest evicted first)
+SEGMENT_CACHE_SIZE = 4
+_segment_cache = {}
 
-    print(f"Shades used: {np.unique(nearest)}")
-    print(f"Transparent pixels preserved: {np.sum(transparent_mask)}")
-    return Image.fromarray(seg_rgba, mode='RGBA')
+
+@timed
+def segment_to_shades(source_image: Image, filament_shades):
+    # Previews re-run segmentation with the same image and shades when unrelated
+    # settings change; reuse the result then (as a copy, callers own the image)
+    # Convert to RGBA to handle transparency (and so palette images hash by their colors)
+    rgba_image = source_image.convert('RGBA')
+    flat_shades = [shade for shade_list in filament_shades for shade in shade_list]
+    cache_key = (rgba_image.size,
+                 hashlib.blake2b(rgba_image.tobytes(), digest_size=16).digest(),
+                 np.asarray(flat_shades, dtype=np.float32).tobytes())
+    cached = _segment_cache.get(cache_key)
+    if cached is not None:
+        return cached.copy()
+
+    result = _segment_to_shades(rgba_image, flat_shades)
+    if len(_segment_cache) >= SEGMENT_CACHE_SIZE:
+        _segment_cache.pop(next(iter(_segment_cache)))
+    _segment_cache[cache_key] = result.copy()
+    return result
+
+
+def _segment_to_shades(rgba_image: Image, flat_shades):
+    """Nearest-shade segmentation behind segment_to_shades, on an RGBA image and the flattened shade list."""
+    rgba = np.asarray(rgba_image)  # (H, W, 4) uint8
+    h, w = rgba.shape[:2]
+
+    print(f"Total shades: {len(flat_shades)}")
+    shade_rgb = np.array(flat_shades, dtype=np.float32)  # (N, 3), still 0–255
+    shade_lab_t, shade_sq = _shades_to_lab(shade_rgb)  # (3, N), (N,)
+    # Output palette as opaque RGBA packed into one little-endian uint32 per shade (the
+    # same layout as the pixels below), so writing a pixel is a single element store
+    # in its final format
+    shade_rgba_u8 = np.full((len(shade_rgb), 4), 255, dtype=np.uint8)
+    shade_rgba_u8[:, :3] = shade_rgb.astype(np.uint8)
+    shade_px = shade_rgba_u8.view('<u4').reshape(-1)  # (N,)
+
+    # Pixels are read as packed little-endian uint32 RGBA (R in the low byte on every
+    # platform): dropping the alpha byte leaves a 24-bit color key, and a pixel is
+    # opaque (alpha != 0) exactly when its value is at least 1 << 24
+    rgba_px = np.ascontiguousarray(rgba).view('<u4').reshape(-1)  # (H*W,)
+    rgb_bits = np.uint32(0xFFFFFF)
+    alpha_one = np.uint32(1 << 24)
+
+    # Images repeat colors heavily, so the shade search runs once per distinct color
+    # and pixels are mapped through a lookup table over the 24-bit RGB cube. The image
+    # is streamed in blocks of SEGMENT_TILE_PIXELS, so besides the output only
+    # block-sized temporaries exist; the first pass only records which colors occur.
+    # Transparent pixels are matched too: they keep their shade's RGB under alpha 0.
+    present = np.zeros(1 << 24, dtype=bool)
+    n_opaque = 0
+    for start in range(0, h * w, SEGMENT_TILE_PIXELS):
+        block = rgba_px[start:start + SEGMENT_TILE_PIXELS]
+        present[block & rgb_bits] = True
+        n_opaque += np.count_nonzero(block >= alpha_one)
+    colors = np.flatnonzero(present)  # (U,) distinct packed colors
+    colors_rgb = np.stack([colors & 0xFF, (colors >> 8) & 0xFF, colors >> 16], axis=1).astype(np.uint8)
+
+    # Nearest shade by ||a-b||^2 = ||a||^2 - 2a.b + ||b||^2 via one matrix product;
+    # ||a||^2 is the same for every shade of a color, so it is left out of the argmin.
+    # LAB is computed in float32 (ample for 8-bit colors) one block at a time. Large
+    # shade sets are searched with a KD-tree instead, which prunes most shades.
+    nearest = np.empty(len(colors), dtype=np.intp)
+    tree = cKDTree(shade_lab_t.T) if len(shade_px) >= SEGMENT_KDTREE_MIN_SHADES else None
+    for start in range(0, len(colors), SEGMENT_TILE_PIXELS):
+        lab = _rgb_to_lab_u8(colors_rgb[start:start + SEGMENT_TILE_PIXELS])  # (block, 3)
+        if tree is not None:
+            nearest[start:start + SEGMENT_TILE_PIXELS] = tree.query(lab, k=1, workers=-1)[1]
+            continue
+        dists = shade_sq[None, :] - 2.0 * (lab @ shade_lab_t)  # (block, N)
+        nearest[start:start + SEGMENT_TILE_PIXELS] = np.argmin(dists, axis=1)
+
+    # Zero-filled, so the untouched parts of the table are never materialised
+    color_to_shade = np.zeros(1 << 24, dtype=np.int32)
+    color_to_shade[colors] = nearest
+    seg_px = np.empty(h * w, dtype='<u4')
+    for start in range(0, h * w, SEGMENT_TILE_PIXELS):
+        block = rgba_px[start:start + SEGMENT_TILE_PIXELS]
+        out = seg_px[start:start + SEGMENT_TILE_PIXELS]
+        np.take(shade_px, color_to_shade[block & rgb_bits], out=out)
+        out[block < alpha_one] &= rgb_bits  # transparent pixels keep the shade RGB, alpha 0
+    shades_used = np.zeros(len(shade_px), dtype=bool)
+    shades_used[nearest] = True
+
+    print(f"Shades used: {np.flatnonzero(shades_used)}")
+    print(f"Transparent pixels preserved: {h * w - n_opaque}")
+    # Wrap the packed pixels directly (frombuffer shares the array's memory)
+    return Image.frombuffer('RGBA', (w, h), seg_px, 'raw', 'RGBA', 0, 1)
 
 @timed
 def generate_shades_td(
@@ -79,6 +208,16 @@ def generate_shades_td(
     assert len(max_layer_values) == n, "max_layer_values must align with filament_order"
     assert layer_height > 0, "layer_height must be positive"
 
+    # Previews call this with the same settings over and over; the shades are a pure
+    # function of them, so serve repeats from a cache (copied, callers own the lists)
+    key = (tuple(tuple(int(c) for c in color) for color in filament_order),
+           tuple(td_values), tuple(max_layer_values), float(layer_height))
+    return [list(shades) for shades in _generate_shades_td_cached(*key)]
+
+
+@lru_cache(maxsize=128)
+def _generate_shades_td_cached(filament_order, td_values, max_layer_values, layer_height):
+    """Shade computation behind generate_shades_td, on hashable inputs; returns tuples."""
     # Opacity fit constants (same as your reference):
     o = -1.2416557e-02
     A =  9.6407950e-01
@@ -119,27 +258,23 @@ def generate_shades_td(
         # Precompute (1 - alpha) since we raise it a lot
         one_minus_alpha = 1.0 - alpha
 
-        shades = []
         max_layers = max_layer_values[i]
 
-        # Build cumulative RGBA compositing for stacks of L=1..max_layers:
+        # Build cumulative RGBA compositing for stacks of L=1..max_layers, all at once:
         #   For L identical layers over base:
         #     total_top_weight = 1 - (1 - alpha)**L
         #     C_out = base*(1 - total_top_weight) + top*total_top_weight
-        for L in range(1, max_layers + 1):
-            # Remaining transmission after L identical layers
-            remain_after = one_minus_alpha ** L
-            w_top = 1.0 - remain_after  # how much the top color contributes after L layers
-
-            shade = tuple(
-                int(round(base_color[c] * (1.0 - w_top) + cur[c] * w_top))
-                for c in range(3)
-            )
-            shades.append(shade)
+        Ls = np.arange(1, max_layers + 1, dtype=np.float64)
+        # Remaining transmission after L identical layers, and how much the top color contributes
+        remain_after = np.power(one_minus_alpha, Ls)[:, None]
+        w_top = 1.0 - remain_after
+        shades_arr = np.rint(np.asarray(base_color, dtype=np.float64) * (1.0 - w_top)
+                             + np.asarray(cur, dtype=np.float64) * w_top)
+        shades = [tuple(row) for row in shades_arr.astype(int).tolist()]
 
         all_shades.append(shades)
 
-    return all_shades
+    return tuple(tuple(shades) for shades in all_shades)
 
 
 
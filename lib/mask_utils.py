@@ -1,8 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing as mp
+
 import numpy as np
-import geopandas as gpd
 from skimage import measure
-from shapely.geometry import LineString
-from shapely import affinity
+import shapely
 from shapely.ops import unary_union
 
 
@@ -10,52 +11,92 @@ def extract_color_masks(img_arr, filament_shades):
     """
     Extracts boolean masks for each shade of each filament from an image array.
     """
-    rgb = img_arr[..., :3]
-    alpha = img_arr[..., 3:]
-    masks = {}
+    rgb = img_arr[..., :3].astype(np.uint32)
+    packed = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    opaque = img_arr[..., 3] != 0
 
+    # Resolve duplicates first, so every remaining shade has a distinct key; shades
+    # past the base filament get a slot number 1..K for the label image below
+    pending = []
+    slot_keys = []
     used_shades = set()
     for fi, shades in enumerate(filament_shades):
         for si, shade in enumerate(shades):
-            if shade in used_shades:
+            r, g, b = (int(c) for c in shade)
+            shade_key = (r << 16) | (g << 8) | b
+            if shade_key in used_shades:
                 print(f"Skipping duplicate shade {shade} for filament {fi}, shade {si}")
                 continue
             if fi != 0:
-                m = np.all(rgb == shade, axis=2)
-            else:
-                m = np.all(alpha != 0, axis=2)
-            masks[(fi, si)] = m
-            used_shades.add(shade)
+                slot_keys.append(shade_key)
+            pending.append(((fi, si), len(slot_keys) if fi != 0 else 0))
+            used_shades.add(shade_key)
+
+    # Label every pixel with its shade slot through a table over the 24-bit RGB cube
+    # (one gather per pixel); 0 marks pixels matching no shade and transparent ones,
+    # so the alpha mask is applied only once
+    slot_of_color = np.zeros(1 << 24, dtype=np.uint8 if len(slot_keys) < 256 else np.uint16)
+    slot_of_color[slot_keys] = np.arange(1, len(slot_keys) + 1)
+    labels = slot_of_color[packed]
+    labels[~opaque] = 0
+    # Shades that do not occur in the image get an empty mask without a compare pass
+    slot_present = np.bincount(labels.ravel(), minlength=len(slot_keys) + 1) > 0
 
-    alpha_mask = img_arr[..., 3] == 0
-    for key in list(masks.keys()):
-        masks[key] = masks[key] & ~alpha_mask
+    def shade_mask(key, slot):
+        if key[0] == 0:
+            return opaque.copy()
+        if not slot_present[slot]:
+            return np.zeros(labels.shape, dtype=bool)
+        return labels == slot
+
+    # NumPy releases the GIL for the compares, so the scans run in parallel threads
+    with ThreadPoolExecutor(max_workers=mp.cpu_count()) as pool:
+        results = pool.map(shade_mask, *zip(*pending)) if pending else []
+        masks = dict(zip((key for key, _ in pending), results))
 
     return masks
 
 
-def mask_to_polygons(mask, min_area=1, simplify_tol=0.4, marching_squares_level=0.5):
+def mask_to_polygons(mask, min_area=1, simplify_tol=0.4, marching_squares_level=0.5, origin=(0, 0)):
     """
     Converts a boolean mask to a list of Shapely polygons using marching squares.
+    `origin` is the (x, y) pixel position of the mask's top-left corner, for masks
+    cropped out of a larger image.
     """
-    padded = np.pad(mask.astype(float), 1, constant_values=0)
-    rings = [
-        LineString([(p[1], p[0]) for p in c])
-        for c in measure.find_contours(padded, marching_squares_level)
-    ]
+    mask = np.asarray(mask, dtype=np.uint8)  # find_contours casts to float64 once itself
+    if (min(mask.shape) >= 2 and not mask[0].any() and not mask[-1].any()
+            and not mask[:, 0].any() and not mask[:, -1].any()):
+        # The border is already empty, so padding would not change the contours; only
+        # their coordinates, which are shifted by the pad's one pixel instead
+        padded = mask
+        origin = np.add(origin, 1)
+    else:
+        padded = np.pad(mask, 1, constant_values=0)
+    contours = measure.find_contours(padded, marching_squares_level)
 
-    if not rings:
+    if not contours:
         return []
 
-    polys = gpd.GeoSeries(rings).build_area()
-    polys = polys.buffer(0)
-    polys = polys.simplify(simplify_tol)
-    polys = polys[polys.area >= min_area]
+    # Build all rings in one call from (x, y) coordinates (contours are (row, col))
+    coords = np.concatenate(contours)[:, ::-1] + origin
+    ring_ids = np.repeat(np.arange(len(contours)), [len(c) for c in contours])
+    rings = shapely.linestrings(coords, indices=ring_ids)
+
+    # Contours never cross, so the rings are polygonized without a noding pass
+    polys = shapely.get_parts(shapely.build_area(shapely.geometrycollections(rings)))
+    invalid = ~shapely.is_valid(polys)
+    if invalid.any():
+        # buffer(0) rather than make_valid, which can return non-polygonal parts
+        polys[invalid] = shapely.buffer(polys[invalid], 0)
+    polys = shapely.simplify(polys, simplify_tol)
+    polys = polys[shapely.area(polys) >= min_area]
 
-    return list(polys.geometry)
+    return list(polys)
 
 
 def flip_polygons_vertically(polygons, height_px):
     """Flips a list of Shapely polygons vertically within a given height."""
-    flipped = [affinity.scale(poly, xfact=1, yfact=-1, origin=(0, 0)) for poly in polygons]
-    return [affinity.translate(poly, yoff=height_px) for poly in flipped]
+    # y -> height - y on all coordinates of all polygons in one call
+    flipped = shapely.transform(np.asarray(polygons, dtype=object),
+                                lambda coords: np.column_stack([coords[:, 0], height_px - coords[:, 1]]))
+    return list(flipped)
@@ -1,9 +1,15 @@
+import numpy as np
+import shapely
 import trimesh
 from shapely.geometry import MultiPolygon, Polygon
 from shapely.ops import unary_union
 
 from .utils import timed
 
+# Union that only runs the overlay on parts that actually touch (Shapely >= 2.1); the
+# polygons of a layer are mostly disjoint, so most of them are simply collected
+_union_all = getattr(shapely, 'disjoint_subset_union_all', unary_union)
+
 
 def generate_layer_mesh(polygons, thickness):
     """Generates an extruded 3D mesh from a list of 2D polygons."""
@@ -31,16 +37,21 @@ def merge_layers_downward(meshes_list):
     """
     Performs an in-place cumulative union of meshes, from top to bottom.
     """
-    last = None
-    for i, meshes in enumerate(meshes_list[::-1]):
-        if i == len(meshes_list) - 1:
-            continue
-        for j, mesh in enumerate(meshes[::-1]):
-            if last is None:
-                last = mesh
-            else:
-                last = trimesh.util.concatenate(last, mesh)
-                meshes_list[-(i + 1)][-(j + 1)] = last
+    # Meshes in accumulation order (the bottom layer is not merged)
+    order = [(len(meshes_list) - 1 - i, len(meshes) - 1 - j)
+             for i, meshes in enumerate(meshes_list[::-1]) if i != len(meshes_list) - 1
+             for j in range(len(meshes))]
+    if not order:
+        return
+
+    # Each cumulative mesh is a prefix of the concatenation of all of them, so that is
+    # built once and cut at every step instead of re-concatenating a growing mesh
+    merged = trimesh.util.concatenate([meshes_list[li][mi] for li, mi in order])
+    vertex_ends = np.cumsum([len(meshes_list[li][mi].vertices) for li, mi in order])
+    face_ends = np.cumsum([len(meshes_list[li][mi].faces) for li, mi in order])
+    for (li, mi), nv, nf in list(zip(order, vertex_ends, face_ends))[1:]:
+        meshes_list[li][mi] = trimesh.Trimesh(vertices=merged.vertices[:nv].copy(),
+                                              faces=merged.faces[:nf].copy(), process=False)
 
 
 @timed
@@ -54,14 +65,14 @@ def merge_polys_downward(polys_list):
         for j in range(len(layer) - 1, -1, -1):
             group = layer[j]
             if isinstance(group, list):
-                poly = unary_union(group) if group else None
+                poly = _union_all(group) if group else None
             else:
                 poly = group
 
             if poly is None or poly.is_empty:
                 continue
 
-            accumulated = poly if accumulated is None else accumulated.union(poly)
+            accumulated = poly if accumulated is None else _union_all([accumulated, poly])
             polys_list[i][j] = accumulated
 
     return polys_list
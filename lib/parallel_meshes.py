@@ -28,20 +28,28 @@ def polygons_to_meshes_parallel(
     Converts layered polygons to a list of 3D meshes in parallel.
     """
     tasks = []
+    results = []
     for idx, polys in enumerate(polys_list):
         for idy, sublayer in enumerate(polys):
-            tasks.append((idx, idy, sublayer, layer_height))
-    total = len(tasks)
+            if sublayer:
+                tasks.append((idx, idy, sublayer, layer_height))
+            else:
+                # Same result a worker would return, without the round trip
+                results.append((idx, idy, trimesh.Trimesh()))
+    total = len(tasks) + len(results)
     if total == 0:
         if progress_cb: progress_cb(1.0)
         return []
 
-    results = []
-    with mp.Pool(processes=mp.cpu_count()) as pool:
-        for n, triple in enumerate(pool.imap(process_generate_layer_mesh, tasks), start=1):
-            results.append(triple)
-            if progress_cb:
-                progress_cb(n / total)
+    if tasks:
+        # Hand out tasks in batches so small sublayers do not pay one round trip each
+        chunksize = max(1, len(tasks) // (mp.cpu_count() * 4))
+        with mp.Pool(processes=mp.cpu_count()) as pool:
+            for n, triple in enumerate(pool.imap(process_generate_layer_mesh, tasks, chunksize=chunksize),
+                                       start=len(results) + 1):
+                results.append(triple)
+                if progress_cb:
+                    progress_cb(n / total)
 
     meshes_dict = {}
     for idx, idy, mesh in results:
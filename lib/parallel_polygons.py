@@ -1,5 +1,6 @@
 import numpy as np
 import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from .utils import ensure_dir, OUTPUT_DIR, MIN_AREA, SIMPLIFY_TOLERANCE
 from .mask_utils import extract_color_masks, mask_to_polygons, flip_polygons_vertically
 from .utils import timed
@@ -7,10 +8,11 @@ from .utils import timed
 
 def process_mask(task):
     """Worker function for parallel polygon extraction."""
-    (fi, L), mask, h_px, min_area, simplify_tol, marching_squares_level = task
-    if not mask.any():
-        return (fi, L, [])
-    polys = mask_to_polygons(mask, min_area=min_area, simplify_tol=simplify_tol, marching_squares_level=marching_squares_level)
+    (fi, L), cnt, (r0, r1, c0, c1), h_px, min_area, simplify_tol, marching_squares_level = task
+    # Only the bounding box of the layer is traced, outside it the mask is empty
+    mask = cnt[r0:r1, c0:c1] >= L
+    polys = mask_to_polygons(mask, min_area=min_area, simplify_tol=simplify_tol,
+                             marching_squares_level=marching_squares_level, origin=(c0, r0))
     flipped = flip_polygons_vertically(polys, h_px)
     return (fi, L, flipped)
 
@@ -31,41 +33,55 @@ def create_layered_polygons_parallel(
     seg_arr = np.array(segmented_image.convert("RGBA"))
 
     masks = extract_color_masks(seg_arr, shades)
-    counts_map = {}
+
+    # Layer counts only go up to a filament's shade count, so a byte usually holds them
+    count_dtype = np.min_scalar_type(max((len(fs) for fs in shades), default=0))
+    counts = np.zeros((len(shades),) + seg_arr.shape[:2], dtype=count_dtype)
 
     for fi in range(len(shades) - 1, -1, -1):
-        cnt = np.zeros(seg_arr.shape[:2], dtype=int)
+        cnt = counts[fi]
         for si in range(len(shades[fi])):
             m = masks.get((fi, si))
             if m is not None:
                 cnt[m] = si + 1
 
         if fi < len(shades) - 1 and fi != 0:  # If there's a layer above
-            layer_above = counts_map[fi + 1]
+            layer_above = counts[fi + 1]
             mask_to_fill = (layer_above > 0) & (cnt == 0)
             cnt[mask_to_fill] = len(shades[fi])
 
-        counts_map[fi] = cnt
-
     h_px = seg_arr.shape[0]
     tasks = []
+    results = []
     for fi in range(len(shades)):
-        cnt = counts_map[fi]
+        # Per-row and per-column maxima give the bounding box of every `cnt >= L` layer
+        row_max = counts[fi].max(axis=1, initial=0)
+        col_max = counts[fi].max(axis=0, initial=0)
         for L in range(1, len(shades[fi]) + 1):
-            mask_L = cnt >= L
-            tasks.append(((fi, L), mask_L, h_px, min_area, simplify_tol, marching_squares_level))
+            rows = np.flatnonzero(row_max >= L)
+            if not len(rows):
+                # Empty mask: nothing to trace, no need to hand it to a worker
+                results.append((fi, L, []))
+                continue
+            cols = np.flatnonzero(col_max >= L)
+            bbox = (int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1)
+            tasks.append(((fi, L), counts[fi], bbox, h_px, min_area, simplify_tol, marching_squares_level))
 
-    if not tasks:
+    total = len(tasks) + len(results)
+    if not total:
         if progress_cb: progress_cb(1.0)
         return []
 
-    total = len(tasks)
-    results = []
-    with mp.Pool(processes=mp.cpu_count()) as pool:
-        for i, (fi, L, polys) in enumerate(pool.imap_unordered(process_mask, tasks)):
-            results.append((fi, L, polys))
-            if progress_cb:
-                progress_cb((i + 1) / total * 0.5)
+    if tasks:
+        # Threads rather than processes: the GEOS work behind polygonizing and
+        # simplifying releases the GIL, and the count arrays need no copying
+        with ThreadPoolExecutor(max_workers=mp.cpu_count()) as pool:
+            for future in as_completed([pool.submit(process_mask, task) for task in tasks]):
+                results.append(future.result())
+                if progress_cb:
+                    progress_cb(len(results) / total * 0.5)
+    elif progress_cb:
+        progress_cb(0.5)
 
     polys_map = {}
     for fi, L, polys in results:
@@ -1,13 +1,7 @@
-import io
-from PIL import Image
+from PIL import Image, ImageColor, ImageDraw
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-from matplotlib import pyplot as plt
-from matplotlib.path import Path
-from matplotlib.patches import PathPatch
+import shapely
 from shapely.geometry import MultiPolygon
-from shapely.ops import unary_union
 from .utils import timed
 
 
@@ -21,8 +15,9 @@ def render_polygons_to_pil_image(
         progress_cb=None,
 ) -> Image.Image:
     """
-    Renders layered polygons to a PIL Image using Matplotlib with pixel-perfect RGB values.
-    Always renders the longest side to 2048 pixels without axes or labels.
+    Renders layered polygons to a PIL Image with pixel-perfect RGB values.
+    Always renders the longest side to 4096 pixels without axes or labels; the
+    polygons' bounding box is stretched over the whole image.
 
     Args:
         max_size: The real-world size in cm of the longest dimension
@@ -35,12 +30,6 @@ def render_polygons_to_pil_image(
         render_h = target_pixels
         render_w = int((image_size[0] / image_size[1]) * target_pixels)
 
-    w_px, h_px = image_size
-    pixels_per_cm = target_pixels / max_size
-    dpi = 100
-    fig_w_inch = render_w / dpi
-    fig_h_inch = render_h / dpi
-
     flat_polys, flat_colors = [], []
     for layer_idx, layer_groups in enumerate(layered_polygons):
         shades = filament_shades[layer_idx]
@@ -59,62 +48,45 @@ def render_polygons_to_pil_image(
                     flat_polys.append(poly)
                     flat_colors.append(color)
 
+    background = (0, 0, 0, 0) if bg_color == 'none' else ImageColor.getcolor(bg_color, 'RGBA')
+    img = Image.new('RGBA', (render_w, render_h), background)
+    if not flat_polys:
+        return img
+    draw = ImageDraw.Draw(img)
 
-    fig = plt.figure(figsize=(fig_w_inch, fig_h_inch), dpi=dpi)
-    ax = fig.add_subplot(111)
-    ax.set_aspect('equal')
-    ax.set_axis_off()
-    fig.patch.set_facecolor(bg_color)
-    ax.set_facecolor(bg_color)
-
-    if flat_polys:
-        all_polys_union = unary_union(flat_polys)
-        minx, miny, maxx, maxy = all_polys_union.bounds
-        minx_cm = minx / pixels_per_cm
-        miny_cm = miny / pixels_per_cm
-        maxx_cm = maxx / pixels_per_cm
-        maxy_cm = maxy / pixels_per_cm
-        ax.set_xlim(minx_cm, maxx_cm)
-        ax.set_ylim(miny_cm, maxy_cm)
-    else:
-        w_cm = w_px / pixels_per_cm
-        h_cm = h_px / pixels_per_cm
-        ax.set_xlim(0, w_cm)
-        ax.set_ylim(0, h_cm)
+    # Polygon space (y up) -> image pixels (y down), bounding box onto the full image
+    # (the envelope of the pieces is the envelope of their union, no overlay needed)
+    minx, miny, maxx, maxy = shapely.total_bounds(flat_polys)
+    scale = np.array([render_w / ((maxx - minx) or 1.0), -render_h / ((maxy - miny) or 1.0)])
+    offset = np.array([minx, maxy])
+
+    def to_pixels(ring):
+        return (np.asarray(ring.coords)[:, :2] - offset) * scale
 
     length = len(flat_polys)
     for current, (poly, rgb) in enumerate(zip(flat_polys, flat_colors)):
+        fill = (int(rgb[0]), int(rgb[1]), int(rgb[2]), 255)
         geoms = poly.geoms if isinstance(poly, MultiPolygon) else [poly]
         for geom in geoms:
-            verts = list(geom.exterior.coords)
-            verts_cm = [(x / pixels_per_cm, y / pixels_per_cm) for x, y in verts]
-            codes = [Path.MOVETO] + [Path.LINETO] * (len(verts) - 2) + [Path.CLOSEPOLY]
-
+            exterior = to_pixels(geom.exterior)
+            if not geom.interiors:
+                draw.polygon(exterior.ravel().tolist(), fill=fill)
+                continue
+
+            # Holes must show what is underneath, so the polygon is drawn as a mask
+            # over its bounding box and the color is pasted through it
+            x0, y0 = np.floor(exterior.min(axis=0)).astype(int)
+            x1, y1 = np.ceil(exterior.max(axis=0)).astype(int) + 1
+            mask = Image.new('1', (x1 - x0, y1 - y0), 0)
+            mask_draw = ImageDraw.Draw(mask)
+            mask_draw.polygon((exterior - (x0, y0)).ravel().tolist(), fill=1)
             for interior in geom.interiors:
-                icoords = list(interior.coords)
-                icoords_cm = [(x / pixels_per_cm, y / pixels_per_cm) for x, y in icoords]
-                verts_cm += icoords_cm
-                codes += [Path.MOVETO] + [Path.LINETO] * (len(icoords) - 2) + [Path.CLOSEPOLY]
-
-            path = Path(verts_cm, codes)
-            exact_color = (rgb[0] / 255.0, rgb[1] / 255.0, rgb[2] / 255.0)
-            patch = PathPatch(path, facecolor=exact_color, edgecolor='none', linewidth=0, fill=True, antialiased=False)
-            ax.add_patch(patch)
+                mask_draw.polygon((to_pixels(interior) - (x0, y0)).ravel().tolist(), fill=0)
+            img.paste(fill, (int(x0), int(y0)), mask)
 
         if progress_cb and current % 30 == 0:
             progress_cb(0.5 + (current / length) * 0.5)
 
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', pad_inches=0,
-                facecolor=bg_color, edgecolor='none', transparent=bg_color == 'none')
-    plt.close(fig)
-    buf.seek(0)
-
-    img = Image.open(buf)
-    if img.mode != 'RGBA':
-        img = img.convert('RGBA')
-    if img.size != (render_w, render_h):
-        img = img.resize((render_w, render_h), Image.Resampling.NEAREST)
     return img
 
 
@@ -202,24 +174,15 @@ def render_polygons_to_svg(
 
         geoms = poly.geoms if isinstance(poly, MultiPolygon) else [poly]
         for geom in geoms:
-            # Convert exterior coordinates to cm and flip Y-axis
-            exterior_coords = list(geom.exterior.coords)
-            exterior_cm = [(x / pixels_per_cm, (h_px - y) / pixels_per_cm) for x, y in exterior_coords]
-
-            # Build path data for exterior
-            path_data = f"M {exterior_cm[0][0]},{exterior_cm[0][1]} "
-            for x, y in exterior_cm[1:]:
-                path_data += f"L {x},{y} "
-            path_data += "Z "
-
-            # Add holes (interiors)
-            for interior in geom.interiors:
-                interior_coords = list(interior.coords)
-                interior_cm = [(x / pixels_per_cm, (h_px - y) / pixels_per_cm) for x, y in interior_coords]
-                path_data += f"M {interior_cm[0][0]},{interior_cm[0][1]} "
-                for x, y in interior_cm[1:]:
-                    path_data += f"L {x},{y} "
-                path_data += "Z "
+            # Exterior then holes, each converted to cm with the Y-axis flipped
+            ring_parts = []
+            for ring in [geom.exterior, *geom.interiors]:
+                coords = np.asarray(ring.coords)[:, :2]
+                ring_cm = np.column_stack([coords[:, 0] / pixels_per_cm, (h_px - coords[:, 1]) / pixels_per_cm]).tolist()
+                ring_parts.append(f"M {ring_cm[0][0]},{ring_cm[0][1]} ")
+                ring_parts.extend(f"L {x},{y} " for x, y in ring_cm[1:])
+                ring_parts.append("Z ")
+            path_data = ''.join(ring_parts)
 
             # Add path element
             svg_parts.append(f'<path d="{path_data}" fill="{hex_color}" stroke="none" fill-rule="evenodd"/>')
@@ -0,0 +1,20 @@
+import numpy as np
+
+from lib.amsmode.core import generate_enhanced_layers
+
+FILAMENTS = {
+    'White': {'color': (255, 255, 255), 'td': 4.0},
+    'Black': {'color': (0, 0, 0), 'td': 0.6},
+    'Red': {'color': (220, 30, 30), 'td': 2.0},
+}
+
+
+def test_large_min_layers_between_dithering():
+    image = np.random.default_rng(0).integers(0, 256, (6, 6, 3)).astype(np.uint8)
+    unconstrained = generate_enhanced_layers(image, FILAMENTS, 'White', max_layers=8)
+    for spacing in (2, 70):
+        layers, dither_info = generate_enhanced_layers(
+            image, FILAMENTS, 'White', max_layers=8, min_layers_between_dithering=spacing
+        )
+        assert dither_info
+        assert (layers, dither_info) == unconstrained